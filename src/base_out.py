@@ -0,0 +1,75 @@
+import numpy as np
+from typing import Tuple
+
+from cards import Outcome
+
+# base occupancy is a bitmask: 1 for a runner on first, 2 on second, 4 on third
+N_BASE_STATES = 8
+N_OUTS = 3
+
+# bases every runner, and the batter, advance on a hit
+HIT_BASES = {
+    Outcome.SINGLE: 1,
+    Outcome.DOUBLE: 2,
+    Outcome.TRIPLE: 3,
+    Outcome.HOME_RUN: 4,
+}
+
+
+def advance_runners(bases: int, outcome: Outcome) -> Tuple[int, int, int]:
+    """Applies a plate appearance outcome to the runners on base
+
+    On a walk only forced runners move, on a hit every runner advances as many bases as the
+    batter, and on an out nobody moves.
+
+    Args:
+        bases: base occupancy bitmask
+        outcome: plate appearance outcome
+
+    Returns:
+        new base occupancy bitmask, runs scored, and outs made
+    """
+
+    if outcome == Outcome.OUT:
+        return bases, 0, 1
+
+    if outcome == Outcome.WALK:
+        # the batter takes first, pushing along only the runners forced ahead
+        if not bases & 1:
+            return bases | 1, 0, 0
+        if not bases & 2:
+            return bases | 3, 0, 0
+        if not bases & 4:
+            return 7, 0, 0
+        return 7, 1, 0
+
+    hit_bases = HIT_BASES[outcome]
+    runners = [base for base in (1, 2, 3) if bases & (1 << (base - 1))] + [0]
+    new_bases = 0
+    runs = 0
+    for base in runners:
+        if base + hit_bases >= 4:
+            runs += 1
+        else:
+            new_bases |= 1 << (base + hit_bases - 1)
+
+    return new_bases, runs, 0
+
+
+def _transition_tables() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+
+    next_bases = np.zeros((N_BASE_STATES, len(Outcome)), dtype=np.int8)
+    runs = np.zeros((N_BASE_STATES, len(Outcome)), dtype=np.int8)
+    outs = np.zeros(len(Outcome), dtype=np.int8)
+    for bases in range(N_BASE_STATES):
+        for outcome in Outcome:
+            next_bases[bases, outcome], runs[bases, outcome], outs[outcome] = advance_runners(bases, outcome)
+
+    for arr in (next_bases, runs, outs):
+        arr.setflags(write=False)
+
+    return next_bases, runs, outs
+
+
+# lookup tables of advance_runners, indexed by [base occupancy, outcome] (and [outcome] for outs made)
+NEXT_BASES, RUNS_SCORED, OUTS_MADE = _transition_tables()
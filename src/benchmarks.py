@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+
+# Benchmarks for the player peaks pipeline, run against synthetic season tables so no
+# network access is needed
+# Template usage:
+# > python benchmarks.py --benchmarks <benchmarks to run> --rows <row counts to time> --fetch-workers <worker counts to time> --games <game counts to time>
+# Example usage:
+# > python benchmarks.py --benchmarks split fetch games --rows 10000 20000 40000 80000 --fetch-workers 1 4 8 --games 10000 100000 1000000
+# Example usage, timing each stage of the peaks pipeline and saving the results to compare across commits:
+# > python benchmarks.py --benchmarks pipeline --pipeline-rows 10000 100000 1000000 --output-json ../data/benchmarks/$(git rev-parse --short HEAD).json
+
+import logging
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame as PandasDataFrame
+from typing import Any, Callable, Dict, List, Tuple
+
+from cards import BatterCard, Outcome
+from game_sim import simulate_games
+from gather_player_peaks import _split_player_stats, _load_batting_stats, compute_player_peaks, write_peaks, SeasonFetcher
+from player_store import PlayerStore
+from players import Player
+from synthetic_stats import synthetic_fetcher, synthetic_stats
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s', level=logging.INFO, stream=sys.stdout)
+
+
+def parse_arguments() -> Any:
+    """Argument parsing
+
+    Returns:
+        Arguments object
+    """
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--benchmarks", dest="benchmarks", type=str, nargs="+", default=["split", "fetch", "games"], choices=["split", "fetch", "games", "pipeline"], help="benchmarks to run")
+    parser.add_argument("--rows", dest="rows", type=int, nargs="+", default=[10_000, 20_000, 40_000, 80_000], help="player-season row counts to benchmark")
+    parser.add_argument("--pipeline-rows", dest="pipeline_rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="player-season row counts to run the peaks pipeline on")
+    parser.add_argument("--seasons-per-player", dest="seasons_per_player", type=int, default=8, help="average career length of the synthetic players")
+    parser.add_argument("--career-distribution", dest="career_distribution", type=str, default="geometric", choices=["geometric", "poisson", "fixed"], help="distribution of synthetic career lengths")
+    parser.add_argument("--name-collision-rate", dest="name_collision_rate", type=float, default=0.01, help="share of synthetic players named after another player")
+    parser.add_argument("--peak-duration", dest="peak_duration", type=int, default=5, help="years defining a 'peak' in the pipeline benchmark")
+    parser.add_argument("--min-seasons", dest="min_seasons", type=int, default=5, help="minimum career length for a player to be sliced")
+    parser.add_argument("--fetch-workers", dest="fetch_workers", type=int, nargs="+", default=[1, 4, 8], help="fetch worker counts to benchmark")
+    parser.add_argument("--fetch-latency", dest="fetch_latency", type=float, default=0.05, help="simulated seconds per season fetch")
+    parser.add_argument("--seasons", dest="seasons", type=int, default=40, help="number of seasons fetched per run")
+    parser.add_argument("--games", dest="games", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="numbers of games to simulate at once")
+    parser.add_argument("--seed", dest="seed", type=int, default=0, help="seed for the synthetic data")
+    parser.add_argument("--output-json", dest="output_json", type=str, default=None, help="file to save the benchmark results to, as JSON")
+
+    args = parser.parse_args()
+
+    return args
+
+
+def latency_fetcher(latency: float, rows_per_season: int = 500, seed: int = 0) -> SeasonFetcher:
+    """Local stand-in for a pybaseball season fetch that sleeps before returning synthetic stats
+
+    Args:
+        latency: seconds to wait per season, simulating the network round-trip
+        rows_per_season: number of player rows per season. Defaults to 500.
+        seed: random seed. Defaults to 0.
+
+    Returns:
+        Season fetcher usable by _load_batting_stats / _load_pitching_stats
+    """
+
+    def fetch(year: int) -> PandasDataFrame:
+        time.sleep(latency)
+        return synthetic_stats(rows_per_season, mean_seasons=1, career_distribution="fixed", start_year=year, end_year=year, seed=seed + year)
+
+    return fetch
+
+
+def _scan_player_stats(stats: PandasDataFrame, min_seasons: int) -> List[Any]:
+    """Per-candidate boolean scan that _split_player_stats replaced, kept as the baseline"""
+
+    counts = stats["Name"].value_counts()
+    candidates = sorted(counts[counts >= min_seasons].index)
+    return [
+        (player, stats[stats["Name"] == player].sort_values(by="Season", ascending=True).reset_index(drop=True))
+        for player in candidates
+    ]
+
+
+def _timed(func: Callable, *args: Any) -> Tuple[Any, float]:
+    """Result and wall-clock seconds of a single call"""
+
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def _time(func: Callable, *args: Any) -> float:
+    """Wall-clock seconds of a single call"""
+
+    return _timed(func, *args)[1]
+
+
+def bench_player_split(rows: List[int], seasons_per_player: int, min_seasons: int, seed: int) -> PandasDataFrame:
+    """Times the grouped split against the per-candidate scan over increasing table sizes
+
+    Args:
+        rows: row counts to benchmark
+        seasons_per_player: average career length of the synthetic players
+        min_seasons: minimum career length for a player to be sliced
+        seed: random seed
+
+    Returns:
+        Row per table size with timings, and the grouped split's time per row
+    """
+
+    results = []
+    for n_rows in rows:
+        stats = synthetic_stats(n_rows, mean_seasons=seasons_per_player, seed=seed)
+        grouped = _time(_split_player_stats, stats, min_seasons)
+        scan = _time(_scan_player_stats, stats, min_seasons)
+        results.append({
+            "rows": n_rows,
+            "grouped_s": grouped,
+            "scan_s": scan,
+            "grouped_us_per_row": 1e6 * grouped / n_rows,
+            "speedup": scan / grouped,
+        })
+        logger.info(f"{n_rows} rows: grouped {grouped:.3f}s, scan {scan:.3f}s")
+
+    return pd.DataFrame(results)
+
+
+def bench_fetch_workers(workers: List[int], latency: float, seasons: int, seed: int) -> PandasDataFrame:
+    """Times season loading against a latency-injecting fetcher for several worker counts
+
+    Args:
+        workers: fetch worker counts to benchmark
+        latency: simulated seconds per season fetch
+        seasons: number of seasons loaded per run
+        seed: random seed
+
+    Returns:
+        Row per worker count with the load time and speedup over the first worker count
+    """
+
+    fetcher = latency_fetcher(latency, seed=seed)
+    results = []
+    for n_workers in workers:
+        elapsed = _time(_load_batting_stats, 2000, 2000 + seasons - 1, n_workers, fetcher)
+        results.append({
+            "workers": n_workers,
+            "seconds": elapsed,
+        })
+    for result in results:
+        result["speedup"] = results[0]["seconds"] / result["seconds"]
+
+    return pd.DataFrame(results)
+
+
+def bench_pipeline(
+    rows: List[int],
+    dur: int,
+    mean_seasons: float,
+    career_distribution: str,
+    name_collision_rate: float,
+    fetch_workers: int,
+    seed: int,
+) -> PandasDataFrame:
+    """Times each stage of the batter peaks pipeline on synthetic seasons served in place of pybaseball
+
+    Stages are ingestion (fetching and concatenating every season), candidate selection, Player
+    construction, peak computation by the per-Player and batch engines, PlayerStore construction
+    and peak computation through its views, and TSV writing.
+
+    Args:
+        rows: player-season row counts to benchmark
+        dur: duration that defines a peak
+        mean_seasons: average career length of the synthetic players
+        career_distribution: distribution of career lengths, see synthetic_stats.career_lengths
+        name_collision_rate: share of synthetic players named after another player
+        fetch_workers: number of seasons fetched concurrently
+        seed: random seed
+
+    Returns:
+        Row per table size with the seconds spent in each stage
+    """
+
+    # per-season fetch logging would drown out the results
+    pipeline_loggers = [logging.getLogger(name) for name in ("gather_player_peaks", "stats_sources")]
+    levels = [pipeline_logger.level for pipeline_logger in pipeline_loggers]
+    for pipeline_logger in pipeline_loggers:
+        pipeline_logger.setLevel(logging.WARNING)
+
+    results = []
+    try:
+        for n_rows in rows:
+            table = synthetic_stats(n_rows, "batters", mean_seasons, career_distribution, name_collision_rate, 1900, 2020, seed)
+            fetcher = synthetic_fetcher(table)
+
+            stats, ingest = _timed(_load_batting_stats, 1900, 2020, fetch_workers, fetcher)
+            candidates, select = _timed(_split_player_stats, stats, dur)
+            players, construct = _timed(lambda: [Player(name, player_stats) for name, player_stats in candidates])
+            _, player_peaks = _timed(lambda: [player.peak_value(dur) for player in players])
+            views, construct_store = _timed(lambda: PlayerStore(stats).players(min_seasons=dur))
+            _, store_peaks = _timed(lambda: [view.peak_value(dur) for view in views])
+            peaks, batch_peaks = _timed(compute_player_peaks, stats, [dur], "batters", "batch")
+            with tempfile.TemporaryDirectory() as storage_path:
+                write = _time(write_peaks, peaks, storage_path, "batter_peaks.tsv")
+
+            results.append({
+                "rows": n_rows,
+                "players": len(candidates),
+                "ingest_s": ingest,
+                "select_candidates_s": select,
+                "construct_players_s": construct,
+                "player_peaks_s": player_peaks,
+                "construct_store_s": construct_store,
+                "store_peaks_s": store_peaks,
+                "batch_peaks_s": batch_peaks,
+                "write_tsv_s": write,
+            })
+            logger.info(f"{n_rows} rows: {len(candidates)} candidates")
+    finally:
+        for pipeline_logger, level in zip(pipeline_loggers, levels):
+            pipeline_logger.setLevel(level)
+
+    return pd.DataFrame(results)
+
+
+def league_average_card(player_name: str = "league average") -> BatterCard:
+    """Batter card for roughly league-average per plate appearance outcome rates"""
+
+    rates = {
+        Outcome.WALK: 0.09,
+        Outcome.SINGLE: 0.15,
+        Outcome.DOUBLE: 0.045,
+        Outcome.TRIPLE: 0.005,
+        Outcome.HOME_RUN: 0.03,
+    }
+    rates[Outcome.OUT] = 1 - sum(rates.values())
+
+    return BatterCard.from_rates(player_name, rates)
+
+
+def bench_game_simulation(games: List[int], seed: int) -> PandasDataFrame:
+    """Times batched game simulation between two league-average lineups
+
+    Args:
+        games: numbers of games to simulate at once
+        seed: random seed
+
+    Returns:
+        Row per batch size with the simulation time and throughput
+    """
+
+    lineup = [league_average_card()] * 9
+    results = []
+    for n_games in games:
+        rng = np.random.default_rng(seed)
+        elapsed = _time(simulate_games, lineup, lineup, n_games, rng)
+        results.append({
+            "games": n_games,
+            "seconds": elapsed,
+            "games_per_s": n_games / elapsed,
+        })
+
+    return pd.DataFrame(results)
+
+
+def _git_commit() -> Any:
+    """Commit hash of the checked out source, or None outside a git checkout"""
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(results: Dict[str, PandasDataFrame], args: Any, output_json: str) -> None:
+    """Saves benchmark results as JSON, along with the commit and environment they were measured on
+
+    Args:
+        results: map of benchmark name to its results table
+        args: parsed arguments of the run
+        output_json: file to write
+    """
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+        "results": {name: json.loads(table.to_json(orient="records")) for name, table in results.items()},
+    }
+
+    output_dir = os.path.dirname(output_json)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output_json, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"saved benchmark results to {output_json}")
+
+    return None
+
+
+def main():
+
+    args = parse_arguments()
+    all_results = {}
+
+    if "split" in args.benchmarks:
+        logger.info("benchmarking per-player slicing")
+        results = bench_player_split(args.rows, args.seasons_per_player, args.min_seasons, args.seed)
+        logger.info(results.to_string(index=False))
+        all_results["split"] = results
+
+    if "fetch" in args.benchmarks:
+        logger.info("benchmarking concurrent season fetching")
+        results = bench_fetch_workers(args.fetch_workers, args.fetch_latency, args.seasons, args.seed)
+        logger.info(results.to_string(index=False))
+        all_results["fetch"] = results
+
+    if "games" in args.benchmarks:
+        logger.info("benchmarking game simulation")
+        results = bench_game_simulation(args.games, args.seed)
+        logger.info(results.to_string(index=False))
+        all_results["games"] = results
+
+    if "pipeline" in args.benchmarks:
+        logger.info("benchmarking the peaks pipeline stages")
+        results = bench_pipeline(
+            args.pipeline_rows, args.peak_duration, args.seasons_per_player, args.career_distribution,
+            args.name_collision_rate, args.fetch_workers[0], args.seed,
+        )
+        logger.info(results.to_string(index=False))
+        all_results["pipeline"] = results
+
+    if args.output_json is not None:
+        save_results(all_results, args, args.output_json)
+
+    return None
+
+
+if __name__ == "__main__":
+    main()
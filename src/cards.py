@@ -0,0 +1,208 @@
+from enum import IntEnum
+import itertools
+
+import numpy as np
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+from dice import RollDistribution, get_roll_distribution
+from players import PeakBatter
+
+
+class Outcome(IntEnum):
+    """Plate appearance outcomes, valued so they can index arrays"""
+
+    OUT = 0
+    WALK = 1
+    SINGLE = 2
+    DOUBLE = 3
+    TRIPLE = 4
+    HOME_RUN = 5
+
+
+# outcomes as named in PeakBatter.outcome_rates
+OUTCOME_NAMES = {
+    Outcome.OUT: "out",
+    Outcome.WALK: "walk",
+    Outcome.SINGLE: "single",
+    Outcome.DOUBLE: "double",
+    Outcome.TRIPLE: "triple",
+    Outcome.HOME_RUN: "home_run",
+}
+
+
+def _fit_ranges_in_order(cdf: np.ndarray, targets: np.ndarray) -> Tuple[float, np.ndarray]:
+    """Splits the roll values into consecutive ranges, one per outcome in the given order, minimizing total probability error
+
+    Args:
+        cdf: probability of rolling each value or lower, with a leading 0 for "below the lowest value"
+        targets: target probability of each outcome, in card order
+
+    Returns:
+        total absolute error, and the cdf index at which each outcome's range ends
+    """
+
+    # error[k][j]: least error placing the first k outcomes on the first j values, by dynamic programming
+    n_cuts = len(cdf)
+    error = np.zeros(n_cuts)
+    error[1:] = np.inf
+    choices = []
+    for target in targets:
+        # cost[i][j]: error of the next outcome taking the values between cuts i and j
+        cost = error[:, None] + np.abs(cdf[None, :] - cdf[:, None] - target)
+        cost[np.tril_indices(n_cuts, -1)] = np.inf
+        choices.append(np.argmin(cost, axis=0))
+        error = np.min(cost, axis=0)
+
+    # the last outcome must take every remaining value, then walk the choices back
+    cuts = [n_cuts - 1]
+    for choice in reversed(choices[1:]):
+        cuts.append(choice[cuts[-1]])
+
+    return error[-1], np.array(cuts[::-1])
+
+
+def fit_card_ranges(
+    rates: Dict[Outcome, float],
+    distribution: Optional[RollDistribution] = None,
+) -> Dict[Outcome, Tuple[int, int]]:
+    """Assigns a range of roll values to each outcome, so the dice probabilities best match the outcome rates
+
+    Outs always take the highest roll values. The other outcomes are tried in every order below
+    them, and for each order the range boundaries minimizing the total absolute difference
+    between rolled and target probabilities are found exactly; the best order wins.
+
+    Args:
+        rates: per plate appearance rate of each outcome, summing to 1
+        distribution: roll value distribution. Defaults to the SI dice.
+
+    Returns:
+        Map of outcome to its inclusive (lowest, highest) roll values. Outcomes too rare to get any roll value are left out.
+    """
+
+    distribution = distribution or get_roll_distribution()
+    cdf = np.r_[0.0, distribution.cdf]
+    hits = [outcome for outcome in Outcome if outcome != Outcome.OUT]
+
+    best_error, best_order, best_cuts = np.inf, None, None
+    for order in itertools.permutations(hits):
+        order = order + (Outcome.OUT,)
+        error, cuts = _fit_ranges_in_order(cdf, np.array([rates.get(outcome, 0.0) for outcome in order]))
+        if error < best_error:
+            best_error, best_order, best_cuts = error, order, cuts
+
+    ranges = {}
+    start = 0
+    for outcome, end in zip(best_order, best_cuts):
+        if end > start:
+            ranges[outcome] = (int(distribution.values[start]), int(distribution.values[end - 1]))
+        start = end
+
+    return ranges
+
+
+class BatterCard:
+
+    def __init__(
+        self,
+        player_name: str,
+        ranges: Dict[Outcome, Tuple[int, int]],
+        distribution: Optional[RollDistribution] = None,
+    ):
+        """SI-style batter card, mapping roll values to plate appearance outcomes
+
+        The card is compiled into a lookup table indexed by roll value, so resolving any number of
+        plate appearances is a single array index.
+
+        Args:
+            player_name: name of the batter
+            ranges: map of outcome to its inclusive (lowest, highest) roll values. Roll values not covered are outs.
+            distribution: roll value distribution the card is rolled with. Defaults to the SI dice.
+        """
+
+        self.player_name = player_name
+        self.ranges = ranges
+        self.distribution = distribution or get_roll_distribution()
+
+        self.lookup = np.full(int(self.distribution.values[-1]) + 1, Outcome.OUT, dtype=np.int8)
+        for outcome, (low, high) in ranges.items():
+            self.lookup[low:high + 1] = outcome
+        self.lookup.setflags(write=False)
+
+    @classmethod
+    def from_rates(
+        cls,
+        player_name: str,
+        rates: Dict[Outcome, float],
+        distribution: Optional[RollDistribution] = None,
+    ) -> "BatterCard":
+        """Builds the card that best matches a batter's outcome rates
+
+        Args:
+            player_name: name of the batter
+            rates: per plate appearance rate of each outcome, summing to 1
+            distribution: roll value distribution the card is rolled with. Defaults to the SI dice.
+
+        Returns:
+            Batter card
+        """
+
+        return cls(player_name, fit_card_ranges(rates, distribution), distribution)
+
+    @classmethod
+    def from_batter(cls, batter: PeakBatter, distribution: Optional[RollDistribution] = None) -> "BatterCard":
+        """Builds the card that best matches a batter's outcome rates over their peak
+
+        Args:
+            batter: batter with a defined peak
+            distribution: roll value distribution the card is rolled with. Defaults to the SI dice.
+
+        Returns:
+            Batter card
+        """
+
+        rates = batter.outcome_rates
+        return cls.from_rates(
+            batter.player_name,
+            {outcome: rates[name] for outcome, name in OUTCOME_NAMES.items()},
+            distribution,
+        )
+
+    def resolve(self, roll_values: Union[int, np.ndarray]) -> Union[int, np.ndarray]:
+        """Resolves plate appearances from their roll values
+
+        Args:
+            roll_values: roll value, or array of roll values
+
+        Returns:
+            Outcome code (an Outcome value) of each plate appearance
+        """
+
+        return self.lookup[roll_values]
+
+    def outcome_probs(self) -> np.ndarray:
+        """Exact probability of each outcome when the card is rolled
+
+        Returns:
+            Array indexed by Outcome value
+        """
+
+        probs = np.zeros(len(Outcome))
+        for outcome, (low, high) in self.ranges.items():
+            probs[outcome] = self.distribution.prob_in_range(low, high)
+        probs[Outcome.OUT] = 1 - probs[1:].sum()
+
+        return probs
+
+
+def build_cards(batters: Sequence[PeakBatter], distribution: Optional[RollDistribution] = None) -> Dict[str, BatterCard]:
+    """Builds a batter card for each batter
+
+    Args:
+        batters: batters with defined peaks
+        distribution: roll value distribution the cards are rolled with. Defaults to the SI dice.
+
+    Returns:
+        Map of batter name to their card
+    """
+
+    return {batter.player_name: BatterCard.from_batter(batter, distribution) for batter in batters}
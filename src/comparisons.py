@@ -0,0 +1,171 @@
+import logging
+import sys
+from statistics import NormalDist
+
+import numpy as np
+from typing import Dict, Optional, Sequence, Union
+
+from cards import BatterCard
+from dice import roll_value_streams
+from game_sim import simulate_games
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s', level=logging.INFO, stream=sys.stdout)
+
+
+class RunningStats:
+    """Running count, mean and variance of a metric, updated in batches (Welford / Chan et al.)"""
+
+    def __init__(self):
+
+        self.count = 0
+        self.mean = 0.0
+        self._sum_sq_dev = 0.0
+
+    def update(self, values: Union[float, np.ndarray]) -> None:
+        """Folds a batch of observations into the running moments
+
+        Args:
+            values: observations
+        """
+
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+        if not len(values):
+            return None
+
+        batch = RunningStats()
+        batch.count = len(values)
+        batch.mean = float(values.mean())
+        batch._sum_sq_dev = float(((values - batch.mean) ** 2).sum())
+        self.merge(batch)
+
+        return None
+
+    def merge(self, other: "RunningStats") -> None:
+        """Folds another set of running moments into this one, e.g. from another worker
+
+        Args:
+            other: running moments to merge in
+        """
+
+        count = self.count + other.count
+        if not count:
+            return None
+
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self._sum_sq_dev += other._sum_sq_dev + delta ** 2 * self.count * other.count / count
+        self.count = count
+
+        return None
+
+    @property
+    def variance(self) -> float:
+        """Sample variance"""
+
+        return self._sum_sq_dev / (self.count - 1) if self.count > 1 else float("nan")
+
+    @property
+    def std_error(self) -> float:
+        """Standard error of the mean"""
+
+        return (self.variance / self.count) ** 0.5 if self.count > 1 else float("nan")
+
+
+def _lineup_runs(
+    lineup: Sequence[BatterCard],
+    opponent: Sequence[BatterCard],
+    n_games: int,
+    rng: np.random.Generator,
+    roll_streams: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Runs scored per game by a lineup batting as the away team against an opponent"""
+
+    return simulate_games(lineup, opponent, n_games, rng, roll_streams=roll_streams)["away_runs"].to_numpy()
+
+
+def compare_lineups(
+    lineup_a: Sequence[BatterCard],
+    lineup_b: Sequence[BatterCard],
+    opponent: Sequence[BatterCard],
+    ci_width: Optional[float] = 0.05,
+    confidence: float = 0.95,
+    batch_games: int = 2000,
+    max_games: int = 200_000,
+    rng: Optional[np.random.Generator] = None,
+    paired: bool = False,
+    stream_length: int = 60,
+) -> Dict[str, float]:
+    """Compares the runs per game of two lineups by simulation, stopping as soon as the comparison is decided
+
+    Both lineups bat against the same opponent, one batch of games at a time, and the running
+    mean and variance of each lineup's runs per game are updated after every batch. Simulation
+    stops once the confidence interval of the difference is narrower than `ci_width` or excludes
+    zero, or once `max_games` per lineup have been played.
+
+    Checking after every batch gives that many chances of a false decision, so each check uses a
+    Bonferroni-corrected interval over the number of batches `max_games` allows, which keeps the
+    overall error rate at 1 - `confidence`.
+
+    In paired mode both lineups replay the same pre-rolled dice streams (common random numbers),
+    game by game, and the interval is built from the running variance of the per-game
+    differences. The reported variance reduction is the variance the difference would have with
+    independent games over the variance actually observed, i.e. how many times fewer games the
+    comparison needs; it is 1 for independent games.
+
+    Args:
+        lineup_a: first lineup's batter cards, in batting order
+        lineup_b: second lineup's batter cards, in batting order
+        opponent: batter cards of the home team both lineups face
+        ci_width: stop once the confidence interval of the difference is this narrow. Defaults to 0.05 runs.
+            None stops only when the interval excludes zero.
+        confidence: overall confidence level. Defaults to 0.95.
+        batch_games: games per lineup simulated between checks. Defaults to 2000.
+        max_games: games per lineup of the fixed budget. Defaults to 200,000.
+        rng: numpy random generator to draw rolls from. Defaults to a freshly seeded generator.
+        paired: simulate both lineups with common random numbers. Defaults to False.
+        stream_length: pre-rolled plate appearances per team and game in paired mode; later
+            plate appearances draw fresh rolls. Defaults to 60.
+
+    Returns:
+        Runs per game of each lineup, their difference (a minus b) with its confidence interval,
+        the games played per lineup, the games saved against the fixed budget, whether the
+        interval excludes zero, and the variance reduction
+    """
+
+    rng = rng if rng is not None else np.random.default_rng()
+    max_batches = -(-max_games // batch_games)
+    z = NormalDist().inv_cdf(1 - (1 - confidence) / (2 * max_batches))
+
+    stats_a, stats_b, stats_diff = RunningStats(), RunningStats(), RunningStats()
+    for batch in range(1, max_batches + 1):
+        n_games = min(batch_games, max_games - stats_a.count)
+        streams = roll_value_streams(2 * n_games, stream_length, rng).reshape(2, n_games, stream_length) if paired else None
+        runs_a = _lineup_runs(lineup_a, opponent, n_games, rng, streams)
+        runs_b = _lineup_runs(lineup_b, opponent, n_games, rng, streams)
+        stats_a.update(runs_a)
+        stats_b.update(runs_b)
+        stats_diff.update(runs_a.astype(np.int64) - runs_b)
+
+        diff = stats_diff.mean
+        independent_var = stats_a.variance + stats_b.variance
+        diff_var = stats_diff.variance if paired else independent_var
+        half_width = z * (diff_var / stats_diff.count) ** 0.5
+        decided = abs(diff) > half_width
+        narrow = ci_width is not None and 2 * half_width <= ci_width
+        if decided or narrow:
+            break
+
+    logger.info(f"stopped after {stats_a.count} of {max_games} games per lineup ({batch} of {max_batches} batches)")
+
+    return {
+        "runs_a": stats_a.mean,
+        "runs_b": stats_b.mean,
+        "difference": diff,
+        "ci_low": diff - half_width,
+        "ci_high": diff + half_width,
+        "games": stats_a.count,
+        "games_saved": 2 * (max_games - stats_a.count),
+        "decided": bool(decided),
+        "variance_reduction": independent_var / diff_var,
+    }
@@ -1,6 +1,9 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple, Union
+import functools
 import random
 
+import numpy as np
+
 
 def calc_roll_value(t: int, a: int, b: int) -> int:
     """Calcuates roll value of 3 SI baseball dice
@@ -22,11 +25,178 @@ class Die:
 
         self.n_sides = len(sides)
         self.sides = sides
+        self._side_array = np.asarray(sides)
 
     def roll(self) -> int:
 
         return random.choice(self.sides)
 
+    def roll_many(self, n: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """Rolls the die many times at once
+
+        Args:
+            n: number of rolls
+            rng: numpy random generator to draw from, for reproducible streams. Defaults to a freshly seeded generator.
+
+        Returns:
+            Array of the n sides rolled
+        """
+
+        rng = rng or np.random.default_rng()
+        return self._side_array[rng.integers(0, self.n_sides, size=n)]
+
+
+# the three SI baseball dice, in the order calc_roll_value takes them
+TENS_DIE = Die([1, 2, 2, 3, 3, 3])
+SMALL_ONES_DIE = Die([0, 0, 1, 2, 3, 4])
+LARGE_ONES_DIE = Die([0, 1, 2, 3, 4, 5])
+SI_DICE = [TENS_DIE, SMALL_ONES_DIE, LARGE_ONES_DIE]
+SI_DICE_MULTIPLIERS = [10, 1, 1]
+
+
+def roll_values(n: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """Rolls the three SI dice many times at once
+
+    Args:
+        n: number of rolls
+        rng: numpy random generator to draw from, for reproducible streams. Defaults to a freshly seeded generator.
+
+    Returns:
+        Array of the n roll values, as calculated by calc_roll_value
+    """
+
+    rng = rng or np.random.default_rng()
+    return calc_roll_value(TENS_DIE.roll_many(n, rng), SMALL_ONES_DIE.roll_many(n, rng), LARGE_ONES_DIE.roll_many(n, rng))
+
+
+def roll_value_streams(n_streams: int, length: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """Pre-rolls fixed streams of SI dice roll values, e.g. to replay the same rolls across simulations
+
+    Args:
+        n_streams: number of streams
+        length: roll values per stream
+        rng: numpy random generator to draw from. Defaults to a freshly seeded generator.
+
+    Returns:
+        Roll values shaped [stream, position], stored as int8
+    """
+
+    return roll_values(n_streams * length, rng).astype(np.int8).reshape(n_streams, length)
+
+
+def spawn_rngs(seed: Optional[int], n: int) -> List[np.random.Generator]:
+    """Creates independent random generators, e.g. one per parallel simulation worker
+
+    Args:
+        seed: root seed, so the set of streams is reproducible. None seeds from the OS.
+        n: number of generators
+
+    Returns:
+        n generators whose streams are statistically independent of each other
+    """
+
+    return [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(n)]
+
+
+def roll_value_distribution(dice: List[Die], multipliers: Optional[List[int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Calculates the exact distribution of the roll value of any set of dice
+
+    The roll value is the sum of each die's face times its multiplier, e.g. 10 for the SI "tens" die.
+    Rather than enumerating every combination of faces, the face counts of each die are convolved,
+    so the cost grows with the range of roll values instead of the number of combinations.
+
+    Args:
+        dice: dice rolled together
+        multipliers: multiplier applied to each die's face. Defaults to 1 for every die.
+
+    Returns:
+        every roll value from the lowest to the highest possible, and the probability of each
+        (zero for values in that range that cannot be rolled)
+    """
+
+    multipliers = multipliers or [1] * len(dice)
+    assert len(multipliers) == len(dice), \
+        f"expected one multiplier per die, received {len(multipliers)} for {len(dice)} dice"
+
+    # integer face counts keep the probabilities exact, unless the number of combinations overflows them
+    n_combinations = 1
+    for die in dice:
+        n_combinations *= die.n_sides
+    count_dtype = np.int64 if n_combinations < 2 ** 62 else np.float64
+
+    counts = np.ones(1, dtype=count_dtype)
+    lowest_value = 0
+    for die, multiplier in zip(dice, multipliers):
+        faces = np.asarray(die.sides, dtype=np.int64) * multiplier
+        face_counts = np.bincount(faces - faces.min()).astype(count_dtype)
+        if count_dtype == np.float64:
+            face_counts /= die.n_sides
+        counts = np.convolve(counts, face_counts)
+        lowest_value += faces.min()
+
+    values = np.arange(lowest_value, lowest_value + len(counts))
+    return values, counts / counts.sum()
+
+
+class RollDistribution:
+
+    def __init__(self, values: np.ndarray, probs: np.ndarray):
+        """Dense distribution of roll values, with constant time probability lookups
+
+        Args:
+            values: every roll value from the lowest to the highest possible, in order
+            probs: probability of each roll value
+        """
+
+        self.values = values
+        self.pmf = probs
+        # cumulative sums are renormalized so the extremes come out at exactly 1
+        self.cdf = np.cumsum(probs)
+        self.cdf /= self.cdf[-1]
+        at_least = np.cumsum(probs[::-1])[::-1]
+        at_least /= at_least[0]
+        self.survival = np.r_[at_least[1:], 0.0]
+
+        # padded so that roll values outside the possible range clip to probability 0 or 1
+        self._at_most = np.r_[0.0, self.cdf, 1.0]
+        self._at_least = np.r_[at_least, 0.0]
+
+        # shared by every caller of get_roll_distribution, so the arrays are frozen
+        for arr in (self.values, self.pmf, self.cdf, self.survival, self._at_most, self._at_least):
+            arr.setflags(write=False)
+
+    def _offset(self, roll_value: Union[int, np.ndarray]) -> np.ndarray:
+        return np.asarray(roll_value) - self.values[0]
+
+    def prob(self, roll_value: Union[int, np.ndarray]) -> Union[float, np.ndarray]:
+        """Probability of rolling exactly a value"""
+        offset = self._offset(roll_value)
+        in_range = (offset >= 0) & (offset < len(self.values))
+        return np.where(in_range, self.pmf[np.clip(offset, 0, len(self.values) - 1)], 0.0)
+
+    def prob_at_most(self, roll_value: Union[int, np.ndarray]) -> Union[float, np.ndarray]:
+        """Probability of rolling a value no higher than `roll_value`"""
+        return self._at_most[np.clip(self._offset(roll_value) + 1, 0, len(self.values) + 1)]
+
+    def prob_at_least(self, roll_value: Union[int, np.ndarray]) -> Union[float, np.ndarray]:
+        """Probability of rolling a value no lower than `roll_value`"""
+        return self._at_least[np.clip(self._offset(roll_value), 0, len(self.values))]
+
+    def prob_in_range(self, low: Union[int, np.ndarray], high: Union[int, np.ndarray]) -> Union[float, np.ndarray]:
+        """Probability of rolling a value between `low` and `high`, inclusive"""
+        return np.maximum(self.prob_at_most(high) - self.prob_at_most(np.asarray(low) - 1), 0.0)
+
+
+@functools.lru_cache(maxsize=None)
+def get_roll_distribution() -> RollDistribution:
+    """Roll value distribution of the three SI dice, computed once and shared
+
+    Returns:
+        Dense distribution over roll values 10 to 39
+    """
+
+    return RollDistribution(*roll_value_distribution(SI_DICE, SI_DICE_MULTIPLIERS))
+
 
 def get_roll_value_probs() -> Dict[int, float]:
     """Defines a map of possible roll values to their respective probabilities
@@ -35,21 +205,87 @@ def get_roll_value_probs() -> Dict[int, float]:
         Dict mapping roll value to probability
     """
 
-    tens_die_sides = [1, 2, 2, 3, 3, 3]
-    small_ones_die_sides = [0, 0, 1, 2, 3, 4]
-    large_ones_die_sides = [0, 1, 2, 3, 4, 5]
-
-    microstates = [
-        calc_roll_value(t, a, b)
-        for t in tens_die_sides
-        for a in small_ones_die_sides
-        for b in large_ones_die_sides
-    ]
-    macrostates = sorted(list(set(microstates)))
+    distribution = get_roll_distribution()
 
     roll_value_prob_map = {
-        mac: len([mic for mic in microstates if mic == mac]) / len(microstates)
-        for mac in macrostates
+        int(value): float(prob)
+        for value, prob in zip(distribution.values, distribution.pmf)
+        if prob > 0
     }
 
     return roll_value_prob_map
+
+
+def _build_alias_table(probs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Builds the probability and alias tables of Vose's alias method
+
+    Args:
+        probs: probability of each outcome, summing to 1
+
+    Returns:
+        acceptance probability of each column, and the outcome each column falls back to
+    """
+
+    n = len(probs)
+    scaled = probs * n
+    prob_table = np.ones(n)
+    alias_table = np.arange(n)
+
+    small = [i for i in range(n) if scaled[i] < 1.0]
+    large = [i for i in range(n) if scaled[i] >= 1.0]
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+        prob_table[s] = scaled[s]
+        alias_table[s] = l
+        scaled[l] = scaled[l] + scaled[s] - 1.0
+        if scaled[l] < 1.0:
+            small.append(l)
+        else:
+            large.append(l)
+
+    # whatever is left over is only off from 1 by rounding error, so it always accepts
+    for i in small + large:
+        prob_table[i] = 1.0
+
+    return prob_table, alias_table
+
+
+class RollSampler:
+
+    def __init__(self, roll_value_probs: Optional[Dict[int, float]] = None, rng: Optional[np.random.Generator] = None):
+        """Draws roll values in constant time per draw, using an alias table built from a roll value distribution
+
+        Args:
+            roll_value_probs: map of roll value to probability. Defaults to the SI dice, from get_roll_value_probs.
+            rng: numpy random generator to draw from. Defaults to a freshly seeded generator.
+        """
+
+        roll_value_probs = roll_value_probs or get_roll_value_probs()
+        self.values = np.array(sorted(roll_value_probs))
+        probs = np.array([roll_value_probs[v] for v in self.values], dtype=float)
+        self.prob_table, self.alias_table = _build_alias_table(probs / probs.sum())
+        self.rng = rng or np.random.default_rng()
+
+    def sample(self) -> int:
+        """Draws a single roll value
+
+        Returns:
+            Roll value
+        """
+
+        return int(self.sample_many(1)[0])
+
+    def sample_many(self, n: int) -> np.ndarray:
+        """Draws many independent roll values at once
+
+        Args:
+            n: number of roll values to draw
+
+        Returns:
+            Array of n roll values
+        """
+
+        cols = self.rng.integers(0, len(self.values), size=n)
+        accept = self.rng.random(n) < self.prob_table[cols]
+        return self.values[np.where(accept, cols, self.alias_table[cols])]
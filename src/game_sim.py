@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+from pandas import DataFrame as PandasDataFrame
+from typing import Optional, Sequence
+
+from base_out import NEXT_BASES, OUTS_MADE, RUNS_SCORED, N_OUTS
+from cards import BatterCard
+from dice import RollSampler
+
+AWAY = 0
+HOME = 1
+
+
+def _lineup_tables(lineups: Sequence[Sequence[BatterCard]]) -> np.ndarray:
+    """Stacks the outcome lookup tables of each team's cards into one [team, lineup slot, roll value] array"""
+
+    n_slots = {len(lineup) for lineup in lineups}
+    assert len(n_slots) == 1, f"lineups must be the same length, received lengths {sorted(n_slots)}"
+
+    return np.stack([np.stack([card.lookup for card in lineup]) for lineup in lineups])
+
+
+def simulate_games(
+    away: Sequence[BatterCard],
+    home: Sequence[BatterCard],
+    n_games: int,
+    rng: Optional[np.random.Generator] = None,
+    innings: int = 9,
+    max_innings: int = 30,
+    roll_streams: Optional[np.ndarray] = None,
+) -> PandasDataFrame:
+    """Simulates many games between two lineups at once
+
+    Every unfinished game advances by one plate appearance per step. Game state lives in numpy
+    arrays (inning, half, outs, base occupancy, score, due batter), so each step resolves a plate
+    appearance in every game with a handful of array operations: one bulk roll draw, a card
+    lookup and the base-out transition tables.
+
+    Home teams do not bat in the last half inning when leading, and games end as soon as the
+    home team takes the lead in the last or an extra inning. Runs scored on the walk-off plate
+    appearance all count.
+
+    Passing `roll_streams` replays pre-rolled dice: each team's k-th plate appearance of a game
+    uses roll k of that team's stream for the game. Simulating two configurations with the same
+    streams (common random numbers) makes their results move together, so the variance of their
+    difference shrinks. Plate appearances beyond the end of a stream draw fresh rolls.
+
+    Args:
+        away: away team's batter cards, in batting order
+        home: home team's batter cards, in batting order
+        n_games: number of games to simulate
+        rng: numpy random generator to draw rolls from. Defaults to a freshly seeded generator.
+        innings: regulation innings. Defaults to 9.
+        max_innings: innings after which a tied game is called. Defaults to 30.
+        roll_streams: pre-rolled roll values shaped [team, game, plate appearance], indexed by AWAY
+            and HOME, e.g. from dice.roll_value_streams. Defaults to None (draw rolls as needed).
+
+    Returns:
+        Row per game with away_runs, home_runs and the innings played
+    """
+
+    tables = _lineup_tables([away, home])
+    n_slots = tables.shape[1]
+    sampler = RollSampler(rng=rng)
+
+    inning = np.ones(n_games, dtype=np.int16)
+    half = np.zeros(n_games, dtype=np.int8)
+    outs = np.zeros(n_games, dtype=np.int8)
+    bases = np.zeros(n_games, dtype=np.int8)
+    score = np.zeros((n_games, 2), dtype=np.int16)
+    due = np.zeros((n_games, 2), dtype=np.int8)
+    pa_count = np.zeros((n_games, 2), dtype=np.int32)
+
+    live = np.arange(n_games)
+    while len(live):
+        team = half[live]
+        slot = due[live, team]
+
+        # resolve one plate appearance in every unfinished game
+        if roll_streams is None:
+            rolls = sampler.sample_many(len(live))
+        else:
+            count = pa_count[live, team]
+            in_stream = count < roll_streams.shape[2]
+            rolls = np.empty(len(live), dtype=np.int64)
+            rolls[in_stream] = roll_streams[team[in_stream], live[in_stream], count[in_stream]]
+            rolls[~in_stream] = sampler.sample_many(int((~in_stream).sum()))
+            pa_count[live, team] += 1
+        outcome = tables[team, slot, rolls]
+        game_bases = bases[live]
+        score[live, team] += RUNS_SCORED[game_bases, outcome]
+        bases[live] = NEXT_BASES[game_bases, outcome]
+        outs[live] += OUTS_MADE[outcome]
+        due[live, team] = (slot + 1) % n_slots
+
+        away_runs = score[live, AWAY]
+        home_runs = score[live, HOME]
+        late = inning[live] >= innings
+        walk_off = late & (team == HOME) & (home_runs > away_runs)
+
+        # half innings ending on this plate appearance
+        side_retired = outs[live] == N_OUTS
+        top_over = side_retired & (team == AWAY)
+        bottom_over = side_retired & (team == HOME)
+        home_skips_bottom = top_over & late & (home_runs > away_runs)
+        decided = bottom_over & late & (home_runs != away_runs)
+        called = bottom_over & (inning[live] >= max_innings)
+
+        next_half = live[side_retired]
+        outs[next_half] = 0
+        bases[next_half] = 0
+        half[live[top_over]] = HOME
+        half[live[bottom_over]] = AWAY
+        inning[live[bottom_over]] += 1
+
+        finished = walk_off | home_skips_bottom | decided | called
+        inning[live[bottom_over & finished]] -= 1
+        live = live[~finished]
+
+    return pd.DataFrame({
+        "away_runs": score[:, AWAY],
+        "home_runs": score[:, HOME],
+        "innings": inning,
+    })
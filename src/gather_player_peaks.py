@@ -9,20 +9,47 @@
 #       peak_value: aggregate WAR over the years of the peak
 #       peak_start_year: first year of the player's peak
 #       peak_end_year: last year of the player's peak
+#   when several peak durations are requested, either one file per duration (suffixed with
+#   the duration, e.g. batter_peaks_5yr.tsv), or one wide file with the peak columns
+#   suffixed by duration (e.g. peak_value_5yr, peak_value_10yr)
 # Template usage:
 # > python gather_player_peaks <start year> <end year> --peak-duration <number years defining peak> --storage-path <local path to store peak files> --batter-file <name of batters peak file> --pitcher-file <name of pitcher file>
 # Example usage:
 # > python gather_player_peaks 1990 2020 --peak-duration 5 --storage-path ./data/ --batter-file batter_peaks.tsv --pitcher-file pitcher_peaks.tsv
+# Example usage, fetching 8 seasons at a time and caching raw season stats between runs:
+# > python gather_player_peaks 1990 2020 --fetch-workers 8 --cache-dir ./data/cache/
+# Example usage, generating batter and pitcher peaks concurrently:
+# > python gather_player_peaks 1990 2020 --parallel
+# Example usage, computing 3, 5 and 10 year peaks from one load into a single wide file per category:
+# > python gather_player_peaks 1990 2020 --peak-duration 3 5 10 --duration-layout wide
+# Example usage, reading previously exported season stats (batters.parquet, pitchers.parquet) instead of pybaseball:
+# > python gather_player_peaks 1990 2020 --stats-source directory --stats-dir ./data/stats/
+# Example usage, reading the Lahman database CSVs, with WAR joined from Baseball-Reference's war_daily files:
+# > python gather_player_peaks 1990 2020 --stats-source lahman --stats-dir ./data/lahman/ --war-dir ./data/bbref_war/
+# Example usage, recording per-stage timings and memory to a JSON metrics file:
+# > python gather_player_peaks 1990 2020 --metrics-file ./data/metrics.json --trace-memory
+# Example usage, profiling the run (profile.prof, profile_top.txt, profile_samples.txt and profile.folded in the storage path):
+# > python gather_player_peaks 1990 2020 --profile --profile-top 40
 
 import logging
 import argparse
+import contextlib
+import multiprocessing
+import os
 import sys
-
-from players import Player
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from players import Player, PeakBatter
+from player_store import PlayerStore
+from peak_engine import compute_peaks_by_duration, PEAK_COLUMNS
+from instrumentation import INSTRUMENTATION, stage
+from profiling import profiled
+from stats_cache import SeasonStatsCache
+from stats_sources import PybaseballSource, SeasonFetcher, StatsSource, make_stats_source
+import numpy as np
 import pandas as pd
 from pandas import DataFrame as PandasDataFrame
-from typing import Any
-import pybaseball as bb
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(format='%(message)s', level=logging.INFO, stream=sys.stdout)
@@ -39,110 +66,417 @@ def parse_arguments() -> Any:
 
     parser.add_argument(dest="start_year", type=int, help="initial season in span to search player peaks")
     parser.add_argument(dest="end_year", type=int, help="final season in span to search for player peaks")
-    parser.add_argument("--peak-duration", dest="peak_duration", type=int, default=5, help="years defining a 'peak'")
+    parser.add_argument("--peak-duration", dest="peak_duration", type=int, nargs="+", default=[5], help="years defining a 'peak', several durations are computed from one load")
+    parser.add_argument("--duration-layout", dest="duration_layout", type=str, default="wide", choices=["wide", "split"], help="with several peak durations, write one wide file or one file per duration")
+    parser.add_argument("--peak-engine", dest="peak_engine", type=str, default="batch", choices=["batch", "player", "store"], help="compute peaks for all players at once, one Player at a time, or one view of a columnar player store at a time")
+    parser.add_argument("--stats-source", dest="stats_source", type=str, default="pybaseball", choices=["pybaseball", "directory", "lahman"], help="where to load season stats from")
+    parser.add_argument("--stats-dir", dest="stats_dir", type=str, default=None, help="directory of season stats, for the directory and lahman sources")
+    parser.add_argument("--war-dir", dest="war_dir", type=str, default=None, help="directory of Baseball-Reference WAR files joined to the lahman source, required with it")
+    parser.add_argument("--fetch-workers", dest="fetch_workers", type=int, default=1, help="number of seasons to fetch concurrently")
+    parser.add_argument("--cache-dir", dest="cache_dir", type=str, default=None, help="directory caching raw per-season stats between runs")
+    parser.add_argument("--refresh-seasons", dest="refresh_seasons", type=int, nargs="+", default=[], help="seasons to refetch even if cached")
+    parser.add_argument("--prune-columns", dest="prune_columns", action="store_true", help="keep only the columns needed for the peaks, with compact dtypes")
+    parser.add_argument("--parallel", dest="parallel", action="store_true", help="generate batter and pitcher peaks concurrently")
+    parser.add_argument("--metrics-file", dest="metrics_file", type=str, default=None, help="JSON file to write per-stage timing and memory metrics to")
+    parser.add_argument("--trace-memory", dest="trace_memory", action="store_true", help="with --metrics-file, also trace peak allocations per stage with tracemalloc (slower)")
+    parser.add_argument("--profile", dest="profile", action="store_true", help="profile the run, writing cProfile and stack sampling reports next to the peak files")
+    parser.add_argument("--profile-by-category", dest="profile_by_category", action="store_true", help="with --profile, write separate reports for batters and pitchers")
+    parser.add_argument("--profile-top", dest="profile_top", type=int, default=30, help="number of functions listed in the profile reports")
+    parser.add_argument("--profile-sample-interval", dest="profile_sample_interval", type=float, default=0.005, help="seconds between stack samples, 0 for cProfile only")
     parser.add_argument("--storage-path", dest="storage_path", type=str, default="../data/", help="directory to store the peaks data")
     parser.add_argument("--batter-file", dest="batter_file", type=str, default="batter_peaks.tsv", help="filename for batters peak data")
     parser.add_argument("--pitcher-file", dest="pitcher_file", type=str, default="pitcher_peaks.tsv", help="filename for pitcher peak data")
 
     args = parser.parse_args()
+    if args.stats_source in {"directory", "lahman"} and args.stats_dir is None:
+        parser.error(f"--stats-source {args.stats_source} requires --stats-dir")
+    # Lahman has no WAR, and every peak is WAR-based
+    if args.stats_source == "lahman" and args.war_dir is None:
+        parser.error("--stats-source lahman requires --war-dir")
     
     return args
 
 
-def _load_pitching_stats(start_year: int, end_year: int) -> PandasDataFrame:
+def _downcast_stats(stats: PandasDataFrame, exact_columns: Sequence[str] = ()) -> PandasDataFrame:
+    """Shrinks a stats table to compact dtypes
+
+    Integer columns take the smallest integer type holding their values (int16 for seasons),
+    float columns become float32 and player names become categorical.
+
+    Args:
+        stats: row per player-season
+        exact_columns: float columns to keep at full precision, e.g. the stat defining a peak,
+            whose sums are written out. Defaults to none.
+
+    Returns:
+        Downcast copy of the stats
+    """
+
+    stats = stats.copy()
+    for col in stats.columns:
+        if col == "Name":
+            stats[col] = stats[col].astype("category")
+        elif pd.api.types.is_integer_dtype(stats[col]) and not pd.api.types.is_extension_array_dtype(stats[col]):
+            stats[col] = pd.to_numeric(stats[col], downcast="integer")
+        elif pd.api.types.is_float_dtype(stats[col]) and col not in exact_columns:
+            stats[col] = stats[col].astype(np.float32)
+
+    return stats
+
+
+def _required_columns(category: str, stat: str = "WAR") -> List[str]:
+    """Columns needed to calculate peaks for a player category
+
+    Args:
+        category: batters or pitchers
+        stat: statistic defining the peak. Defaults to "WAR".
+
+    Returns:
+        Names of the columns to keep
+    """
+
+    columns = ["Name", "Season", stat]
+    if category == "batters":
+        columns += [col for col in PeakBatter.COUNTING_STATS if col not in columns]
+
+    return columns
+
+
+def _load_pitching_stats(
+    start_year: int,
+    end_year: int,
+    fetch_workers: int = 1,
+    fetcher: Optional[SeasonFetcher] = None,
+    cache: Optional[SeasonStatsCache] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> PandasDataFrame:
     """Loads per-player pitching stats by year from baseball reference
 
     Args:
         start_year: first year to load from
         end_year: last year to load from
+        fetch_workers: number of seasons to fetch concurrently. Defaults to 1.
+        fetcher: fetches one season of pitching stats. Defaults to pybaseball.
+        cache: on-disk cache of raw season stats, consulted before fetching. Defaults to None.
+        columns: columns to keep from each season. Defaults to None (keep all).
 
     Returns:
         Dataframe with a row per player-year and all pitching stats from baseball reference
     """
-    
-    stats_by_year = []
-    for year in range(start_year, end_year + 1):
-        logger.info(f"loading pitcher stats for {year}")
-        stats = bb.pitching_stats(year, qual=1)
-        stats_by_year.append(stats)
-    stats = pd.concat(stats_by_year).reset_index(drop=True)
 
-    return stats
+    source = PybaseballSource(fetch_workers, cache, {"pitchers": fetcher} if fetcher else None)
+
+    return source.load("pitchers", range(start_year, end_year + 1), columns)
 
 
-def _load_batting_stats(start_year: int, end_year:int) -> PandasDataFrame:
+def _load_batting_stats(
+    start_year: int,
+    end_year: int,
+    fetch_workers: int = 1,
+    fetcher: Optional[SeasonFetcher] = None,
+    cache: Optional[SeasonStatsCache] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> PandasDataFrame:
     """Loads per-player batting stats by year from baseball reference
 
     Args:
         start_year: first year to load from
         end_year: last year to load from
+        fetch_workers: number of seasons to fetch concurrently. Defaults to 1.
+        fetcher: fetches one season of batting stats. Defaults to pybaseball.
+        cache: on-disk cache of raw season stats, consulted before fetching. Defaults to None.
+        columns: columns to keep from each season. Defaults to None (keep all).
 
     Returns:
         Dataframe with a row per player-year and all batting stats from baseball reference
     """
 
-    stats_by_year = []
-    for year in range(start_year, end_year + 1):
-        logger.info(f"loading batting stats for {year}")
-        stats = bb.batting_stats(year, qual=1)
-        stats_by_year.append(stats)
-    stats = pd.concat(stats_by_year).reset_index(drop=True)
+    source = PybaseballSource(fetch_workers, cache, {"batters": fetcher} if fetcher else None)
 
-    return stats
+    return source.load("batters", range(start_year, end_year + 1), columns)
 
 
-def load_player_peaks(
+def _split_player_stats(stats: PandasDataFrame, min_seasons: int = 1) -> List[Tuple[str, PandasDataFrame]]:
+    """Splits a multi-season stats table into per-player slices in a single pass
+
+    The table is sorted once by player and season, after which each player's seasons
+    occupy a contiguous block of rows, so slicing is done by offsets rather than by
+    rescanning the full table for every player.
+
+    Args:
+        stats: row per player-season, with "Name" and "Season" columns
+        min_seasons: minimum number of seasons a player needs to be included. Defaults to 1.
+
+    Returns:
+        (player name, season-ordered stats) pairs, sorted by player name
+    """
+
+    if stats.empty:
+        return []
+
+    stats = stats.sort_values(by=["Name", "Season"], kind="mergesort").reset_index(drop=True)
+    names = stats["Name"].to_numpy()
+
+    # offsets of the first row of each player's block, and one past its last row
+    starts = np.flatnonzero(np.r_[True, names[1:] != names[:-1]])
+    ends = np.r_[starts[1:], len(names)]
+    keep = (ends - starts) >= min_seasons
+
+    return [
+        (names[start], stats.iloc[start:end].reset_index(drop=True))
+        for start, end in zip(starts[keep], ends[keep])
+    ]
+
+
+def _load_category_stats(
     start_year: int,
     end_year: int,
-    dur: int,
     category: str,
+    fetch_workers: int = 1,
+    cache: Optional[SeasonStatsCache] = None,
+    prune: bool = False,
+    source: Optional[StatsSource] = None,
 ) -> PandasDataFrame:
-    """Loads and calculates peak values for all players over a specified time window.
+    """Loads the season stats of batters or pitchers over a time window
 
     Args:
         start_year: first year to load
         end_year: last year to load
-        dur: duration that defines a peak
         category: batters or pitchers
+        fetch_workers: number of seasons to fetch concurrently. Defaults to 1.
+        cache: on-disk cache of raw season stats, consulted before fetching. Defaults to None.
+        prune: keep only the columns needed for peaks, downcast to compact dtypes. Defaults to False.
+        source: where season stats are loaded from. Defaults to pybaseball, with `fetch_workers` and `cache`.
 
     Returns:
-        Row per player, describing their peak
+        Dataframe with a row per player-year
     """
 
     assert category in {"batters", "pitchers"}, \
         f"category must be one of 'batters' or 'pitchers', received {category}"
 
-    # load stats over the defined time interval
     logger.info(f"loading statistics for {category} from {start_year} to {end_year}")
-    if category == "pitchers":
-        stats = _load_pitching_stats(start_year, end_year)
+    columns = _required_columns(category) if prune else None
+    source = source or PybaseballSource(fetch_workers, cache)
+    with stage("load", category=category):
+        stats = source.load(category, range(start_year, end_year + 1), columns)
+
+    if prune:
+        pruned_bytes = stats.memory_usage(deep=True).sum()
+        with stage("downcast", category=category):
+            stats = _downcast_stats(stats, exact_columns=["WAR"])
+        logger.info(f"downcast {category} stats: {pruned_bytes / 1e6:.1f} MB -> {stats.memory_usage(deep=True).sum() / 1e6:.1f} MB")
+
+    return stats
+
+
+def compute_player_peaks(
+    stats: PandasDataFrame,
+    durs: Sequence[int],
+    category: str,
+    engine: str = "batch",
+) -> Dict[int, PandasDataFrame]:
+    """Calculates peak values for all players in a loaded season table, for one or more peak durations
+
+    Args:
+        stats: row per player-season
+        durs: durations that define a peak
+        category: batters or pitchers, for logging
+        engine: "batch" to compute every player's peak in one vectorized pass, "player" to
+            build a Player per candidate, or "store" to read each candidate through a view of one
+            columnar PlayerStore. Defaults to "batch".
+
+    Returns:
+        Map of duration to a row per player, describing their peak
+    """
+
+    assert engine in {"batch", "player", "store"}, \
+        f"engine must be one of 'batch', 'player' or 'store', received {engine}"
+
+    if engine == "batch":
+        with stage("peaks", category=category, engine=engine):
+            peaks = compute_peaks_by_duration(stats, durs, stat="WAR")
     else:
-        stats = _load_batting_stats(start_year, end_year)
-        
-    
-    # get the set of players with careers long enough to have a peak of the specified duration
-    career_durations = stats["Name"].value_counts().reset_index().rename(columns={"index": "Name", "Name": "Seasons"})
-    candidates = sorted(list(set(career_durations[career_durations["Seasons"] >= dur]["Name"].values)))
-    logger.info(f"# candidate {category}: {len(candidates)}")
-
-    # get stats for each candidate player
-    players = []
-    for player in candidates:
-        player_stats = stats[stats["Name"] == player].sort_values(by="Season", ascending=True).reset_index(drop=True)
-        players.append(Player(player, player_stats))
-
-    # get the stat value for the players peak, and the peak years
-    rows = []
-    for player in players:
-        row = {
-            "player_name": player.player_name,
-            "peak_value": player.peak_value(dur, stat="WAR"),
-            "peak_start_year": player.peak_start_year(dur, stat="WAR"),
-            "peak_end_year": player.peak_end_year(dur, stat="WAR"),
-        }
-        rows.append(row)
-
-    return pd.DataFrame(rows)
+        # get stats for each player with a career long enough to have a peak of the shortest duration
+        if engine == "store":
+            with stage("construct_players", category=category):
+                players = PlayerStore(stats).players(min_seasons=min(durs))
+            n_seasons = [player.n_seasons for player in players]
+        else:
+            with stage("select_candidates", category=category):
+                candidates = _split_player_stats(stats, min_seasons=min(durs))
+            with stage("construct_players", category=category):
+                players = [Player(player, player_stats) for player, player_stats in candidates]
+            n_seasons = [player_stats.shape[0] for _, player_stats in candidates]
+
+        # get the stat value for the players peak, and the peak years
+        peaks = {}
+        for dur in durs:
+            with stage("peaks", category=category, engine=engine, duration=dur):
+                rows = []
+                for player, player_seasons in zip(players, n_seasons):
+                    # as with the batch engine, players without a window free of missing values have no peak
+                    if player_seasons < dur or player.peak_start_year(dur, stat="WAR") is None:
+                        continue
+                    row = {
+                        "player_name": player.player_name,
+                        "peak_value": player.peak_value(dur, stat="WAR"),
+                        "peak_start_year": player.peak_start_year(dur, stat="WAR"),
+                        "peak_end_year": player.peak_end_year(dur, stat="WAR"),
+                    }
+                    rows.append(row)
+                peaks[dur] = pd.DataFrame(rows, columns=PEAK_COLUMNS)
+
+    for dur in durs:
+        logger.info(f"# candidate {category} for a {dur} year peak: {peaks[dur].shape[0]}")
+
+    return peaks
+
+
+def load_player_peaks(
+    start_year: int,
+    end_year: int,
+    dur: Union[int, Sequence[int]],
+    category: str,
+    engine: str = "batch",
+    fetch_workers: int = 1,
+    cache: Optional[SeasonStatsCache] = None,
+    prune: bool = False,
+    source: Optional[StatsSource] = None,
+) -> Union[PandasDataFrame, Dict[int, PandasDataFrame]]:
+    """Loads and calculates peak values for all players over a specified time window.
+
+    Args:
+        start_year: first year to load
+        end_year: last year to load
+        dur: duration that defines a peak, or several durations to compute from one load
+        category: batters or pitchers
+        engine: "batch" to compute every player's peak in one vectorized pass, "player" to
+            build a Player per candidate, or "store" to read each candidate through a view of one
+            columnar PlayerStore. Defaults to "batch".
+        fetch_workers: number of seasons to fetch concurrently. Defaults to 1.
+        cache: on-disk cache of raw season stats, consulted before fetching. Defaults to None.
+        prune: keep only the columns needed for peaks, downcast to compact dtypes. Defaults to False.
+        source: where season stats are loaded from. Defaults to pybaseball, with `fetch_workers` and `cache`.
+
+    Returns:
+        Row per player, describing their peak. A map of duration to such rows if several durations were given.
+    """
+
+    stats = _load_category_stats(start_year, end_year, category, fetch_workers, cache, prune, source)
+
+    if isinstance(dur, int):
+        return compute_player_peaks(stats, [dur], category, engine)[dur]
+    return compute_player_peaks(stats, dur, category, engine)
+
+
+def load_player_peaks_parallel(
+    start_year: int,
+    end_year: int,
+    durs: Sequence[int],
+    categories: Sequence[str] = ("batters", "pitchers"),
+    engine: str = "batch",
+    fetch_workers: int = 1,
+    cache: Optional[SeasonStatsCache] = None,
+    prune: bool = False,
+    source: Optional[StatsSource] = None,
+    compute_in_process: bool = False,
+) -> Dict[str, Dict[int, PandasDataFrame]]:
+    """Loads and calculates peak values for several player categories concurrently
+
+    Each category's stats are fetched on its own thread, since fetching is I/O bound. The
+    player and store engines then calculate peaks in a separate process, since they are CPU
+    bound, and only the columns peaks are calculated from are sent to it. The batch engine is
+    fast enough that sending the stats would cost more than it saves, so it runs on the fetch
+    thread. Profilers only see the current process, so with `compute_in_process` every engine
+    runs on the fetch threads, trading the parallel speedup for a profile of the computation.
+
+    Args:
+        start_year: first year to load
+        end_year: last year to load
+        durs: durations that define a peak
+        categories: player categories to generate. Defaults to batters and pitchers.
+        engine: "batch", "player" or "store", see compute_player_peaks. Defaults to "batch".
+        fetch_workers: number of seasons to fetch concurrently, per category. Defaults to 1.
+        cache: on-disk cache of raw season stats, consulted before fetching. Defaults to None.
+        prune: keep only the columns needed for peaks, downcast to compact dtypes. Defaults to False.
+        source: where season stats are loaded from. Defaults to pybaseball, with `fetch_workers` and `cache`.
+        compute_in_process: calculate peaks on the fetch threads for every engine. Defaults to False.
+
+    Returns:
+        Map of category to a map of duration to a row per player describing their peak, in the order of `categories`
+    """
+
+    # workers start on the first submit, from a fetch thread while the other category's fetches
+    # run, and forking a multi-threaded process can deadlock, so they are spawned instead. A
+    # spawned worker imports the pipeline afresh, with instrumentation off.
+    compute_pool_context = contextlib.nullcontext() if compute_in_process or engine == "batch" else \
+        ProcessPoolExecutor(max_workers=len(categories), mp_context=multiprocessing.get_context("spawn"))
+
+    with ThreadPoolExecutor(max_workers=len(categories)) as fetch_pool, compute_pool_context as compute_pool:
+
+        def generate(category: str) -> Dict[int, PandasDataFrame]:
+            stats = _load_category_stats(start_year, end_year, category, fetch_workers, cache, prune, source)
+            if compute_pool is None:
+                return compute_player_peaks(stats, durs, category, engine)
+            # stats are pickled to the compute process, so send only what peaks are calculated from
+            stats = stats[["Name", "Season", "WAR"]]
+            # stages recorded inside the compute process stay there, so time the whole computation from here
+            with stage("peaks", category=category, engine=engine):
+                return compute_pool.submit(compute_player_peaks, stats, durs, category, engine).result()
+
+        futures = {category: fetch_pool.submit(generate, category) for category in categories}
+        return {category: futures[category].result() for category in categories}
+
+
+def _widen_peaks(peaks: Dict[int, PandasDataFrame]) -> PandasDataFrame:
+    """Joins the peaks for several durations into one row per player, with duration-suffixed columns
+
+    Args:
+        peaks: map of duration to a row per player describing their peak
+
+    Returns:
+        Row per player, with peak columns for each duration. Empty where a career is shorter than the duration.
+    """
+
+    wide = None
+    for dur in sorted(peaks):
+        dur_peaks = peaks[dur].rename(columns={col: f"{col}_{dur}yr" for col in PEAK_COLUMNS if col != "player_name"})
+        for col in [f"peak_start_year_{dur}yr", f"peak_end_year_{dur}yr"]:
+            dur_peaks[col] = dur_peaks[col].astype("Int64")
+        wide = dur_peaks if wide is None else wide.merge(dur_peaks, on="player_name", how="outer")
+
+    return wide.sort_values(by="player_name").reset_index(drop=True)
+
+
+def write_peaks(peaks: Dict[int, PandasDataFrame], storage_path: str, file_name: str, layout: str = "wide") -> None:
+    """Writes player peaks to TSV, as one file for a single duration or per `layout` for several
+
+    Args:
+        peaks: map of duration to a row per player describing their peak
+        storage_path: directory to write to
+        file_name: name of the peaks file. With the "split" layout, each duration is written to
+            this name suffixed with the duration, e.g. batter_peaks_5yr.tsv
+        layout: "wide" or "split". Defaults to "wide".
+    """
+
+    assert layout in {"wide", "split"}, \
+        f"layout must be one of 'wide' or 'split', received {layout}"
+
+    if len(peaks) == 1:
+        outputs = {file_name: next(iter(peaks.values()))}
+    elif layout == "wide":
+        outputs = {file_name: _widen_peaks(peaks)}
+    else:
+        root, ext = os.path.splitext(file_name)
+        outputs = {f"{root}_{dur}yr{ext}": peaks[dur] for dur in sorted(peaks)}
+
+    for name, output in outputs.items():
+        logger.info(f"writing {output.shape[0]} records to {os.path.join(storage_path, name)}")
+        with stage("write", file=name):
+            output.to_csv(os.path.join(storage_path, name), sep="\t", index=False)
+
+    return None
 
 
 def main():
@@ -152,30 +486,96 @@ def main():
     start_year = args.start_year
     end_year = args.end_year
     peak_duration = args.peak_duration
+    duration_layout = args.duration_layout
+    peak_engine = args.peak_engine
+    stats_source = args.stats_source
+    stats_dir = args.stats_dir
+    war_dir = args.war_dir
+    fetch_workers = args.fetch_workers
+    parallel = args.parallel
+    prune_columns = args.prune_columns
+    cache_dir = args.cache_dir
+    refresh_seasons = args.refresh_seasons
     storage_path = args.storage_path
     if not storage_path.endswith("/"):
         storage_path += "/"
     batter_file = args.batter_file
     pitcher_file = args.pitcher_file
+    metrics_file = args.metrics_file
+    trace_memory = args.trace_memory
+    profile = args.profile
+    profile_by_category = args.profile_by_category
+    profile_top = args.profile_top
+    profile_sample_interval = args.profile_sample_interval
 
     logger.info(f"start year: {start_year}")
     logger.info(f"end year: {end_year}")
     logger.info(f"peak duration: {peak_duration}")
+    logger.info(f"duration layout: {duration_layout}")
+    logger.info(f"peak engine: {peak_engine}")
+    logger.info(f"stats source: {stats_source}")
+    logger.info(f"stats directory: {stats_dir}")
+    logger.info(f"WAR directory: {war_dir}")
+    logger.info(f"fetch workers: {fetch_workers}")
+    logger.info(f"parallel: {parallel}")
+    logger.info(f"prune columns: {prune_columns}")
+    logger.info(f"cache location: {cache_dir}")
+    logger.info(f"refreshed seasons: {refresh_seasons}")
     logger.info(f"storage location: {storage_path}")
     logger.info(f"batter filename: {batter_file}")
     logger.info(f"pitcher filename: {pitcher_file}")
-    
-    # generate peaks info for batters
-    logger.info(f"genarating batter peaks")
-    batter_peaks = load_player_peaks(start_year, end_year, peak_duration, "batters")
-    logger.info(f"writing {batter_peaks.shape[0]} records to {storage_path + batter_file}")
-    batter_peaks.to_csv(storage_path + batter_file, sep="\t", index=False)
-
-    # generate peaks info for pitchers
-    logger.info(f"genarating pitcher peaks")
-    pitcher_peaks = load_player_peaks(start_year, end_year, peak_duration, "pitchers")
-    logger.info(f"writing {pitcher_peaks.shape[0]} records to {storage_path + pitcher_file}")
-    pitcher_peaks.to_csv(storage_path + pitcher_file, sep="\t", index=False)
+    logger.info(f"metrics file: {metrics_file}")
+    logger.info(f"trace memory: {trace_memory}")
+    logger.info(f"profile: {profile}")
+    logger.info(f"profile by category: {profile_by_category}")
+
+    if metrics_file is not None:
+        INSTRUMENTATION.enable(trace_memory)
+
+    cache = SeasonStatsCache(cache_dir, refresh_seasons) if cache_dir is not None else None
+    source = make_stats_source(stats_source, stats_dir, fetch_workers, cache, war_dir)
+
+    # categories generated concurrently cannot be told apart by one profiler, so --parallel profiles the whole run
+    if profile_by_category and parallel:
+        logger.warning("--profile-by-category is not supported with --parallel, profiling the whole run instead")
+    profile_run = profile and (parallel or not profile_by_category)
+    profile_categories = profile and not profile_run
+
+    def profile_context(name: str, enabled: bool):
+        if not enabled:
+            return contextlib.nullcontext()
+        return profiled(storage_path, name, profile_top, profile_sample_interval or None)
+
+    with profile_context("profile", profile_run):
+        if parallel:
+            # generate peaks info for batters and pitchers concurrently, then write them in a fixed order
+            logger.info(f"genarating batter and pitcher peaks in parallel")
+            if profile:
+                logger.warning("profiling with --parallel: peaks are calculated on the fetch threads of this process, seen by the stack sampler, rather than in worker processes")
+            peaks = load_player_peaks_parallel(
+                start_year, end_year, peak_duration, ("batters", "pitchers"), peak_engine, fetch_workers, cache, prune_columns, source,
+                compute_in_process=profile,
+            )
+            write_peaks(peaks["batters"], storage_path, batter_file, duration_layout)
+            write_peaks(peaks["pitchers"], storage_path, pitcher_file, duration_layout)
+        else:
+            # generate peaks info for batters
+            with profile_context("profile_batters", profile_categories):
+                logger.info(f"genarating batter peaks")
+                batter_peaks = load_player_peaks(start_year, end_year, peak_duration, "batters", peak_engine, fetch_workers, cache, prune_columns, source)
+                write_peaks(batter_peaks, storage_path, batter_file, duration_layout)
+
+            # generate peaks info for pitchers
+            with profile_context("profile_pitchers", profile_categories):
+                logger.info(f"genarating pitcher peaks")
+                pitcher_peaks = load_player_peaks(start_year, end_year, peak_duration, "pitchers", peak_engine, fetch_workers, cache, prune_columns, source)
+                write_peaks(pitcher_peaks, storage_path, pitcher_file, duration_layout)
+
+    if metrics_file is not None:
+        logger.info("stage summary:")
+        logger.info(INSTRUMENTATION.summary().to_string(index=False, float_format="{:.3f}".format))
+        INSTRUMENTATION.write_json(metrics_file, metadata={"args": vars(args)})
+        INSTRUMENTATION.disable()
 
     return None    
 
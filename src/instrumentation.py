@@ -0,0 +1,201 @@
+import datetime
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+from pandas import DataFrame as PandasDataFrame
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:
+    # Unix only, peak RSS is not reported elsewhere
+    resource = None
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s', level=logging.INFO, stream=sys.stdout)
+
+MB = 1e6
+
+
+def _rss_bytes() -> Optional[int]:
+    """Current resident set size of the process, where /proc is available"""
+
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    """High-water mark of the process' resident set size, where the resource module is available"""
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Instrumentation:
+
+    def __init__(self):
+        """Records the wall time, CPU time and memory of named pipeline stages
+
+        Stages nest, and may run on worker threads (e.g. per season fetches). Memory is sampled
+        for stages on the main thread only: the process' current and peak RSS when a stage ends,
+        and, when memory tracing is on, the peak of memory traced by tracemalloc while the stage
+        ran. Tracing slows allocation-heavy code, so it is opt-in.
+
+        Recording is off until enabled, and stages then cost next to nothing.
+        """
+
+        self.enabled = False
+        self.trace_memory = False
+        self.records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._open_peaks: List[List[int]] = []
+        self._started = None
+        self._started_at = None
+
+    def enable(self, trace_memory: bool = False) -> None:
+        """Starts recording stages
+
+        Args:
+            trace_memory: also trace Python and numpy allocations with tracemalloc. Defaults to False.
+        """
+
+        self.enabled = True
+        self.trace_memory = trace_memory
+        self.records = []
+        self._started = time.perf_counter()
+        self._started_at = datetime.datetime.now(datetime.timezone.utc)
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        return None
+
+    def disable(self) -> None:
+        """Stops recording stages, keeping those recorded so far"""
+
+        self.enabled = False
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+        return None
+
+    @contextmanager
+    def stage(self, name: str, **labels: Any) -> Iterator[None]:
+        """Times the enclosed block as a named stage
+
+        Args:
+            name: stage name, e.g. "fetch" or "peaks"
+            labels: attributes distinguishing this run of the stage, e.g. category or season
+        """
+
+        if not self.enabled:
+            yield
+            return
+
+        main_thread = threading.current_thread() is threading.main_thread()
+        traced = self.trace_memory and main_thread and tracemalloc.is_tracing()
+        if traced:
+            # fold the peak so far into the enclosing stages before resetting it for this one
+            traced_peak = tracemalloc.get_traced_memory()[1]
+            for peak in self._open_peaks:
+                peak[0] = max(peak[0], traced_peak)
+            tracemalloc.reset_peak()
+            self._open_peaks.append([0])
+
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            record = {
+                "stage": name,
+                **labels,
+                "thread": threading.current_thread().name,
+                "start_s": start - self._started,
+                "seconds": time.perf_counter() - start,
+                "cpu_s": time.process_time() - cpu_start,
+            }
+            if traced:
+                peak = self._open_peaks.pop()
+                record["traced_peak_mb"] = max(peak[0], tracemalloc.get_traced_memory()[1]) / MB
+                for parent in self._open_peaks:
+                    parent[0] = max(parent[0], peak[0])
+            if main_thread:
+                rss = _rss_bytes()
+                record["rss_mb"] = rss / MB if rss is not None else None
+                peak_rss = _peak_rss_bytes()
+                record["rss_peak_mb"] = peak_rss / MB if peak_rss is not None else None
+            with self._lock:
+                self.records.append(record)
+
+    def summary(self) -> PandasDataFrame:
+        """Totals per stage and category, in the order stages first ran
+
+        Returns:
+            Row per stage and category with the number of runs, total and longest seconds, total
+            CPU seconds and, where sampled, the largest traced and RSS peaks
+        """
+
+        if not self.records:
+            return pd.DataFrame()
+
+        records = pd.DataFrame(self.records)
+        if "category" not in records.columns:
+            records["category"] = None
+        records["category"] = records["category"].fillna("")
+
+        aggs = {"runs": ("seconds", "size"), "seconds": ("seconds", "sum"), "max_seconds": ("seconds", "max"), "cpu_s": ("cpu_s", "sum")}
+        for col in ("traced_peak_mb", "rss_peak_mb"):
+            if col in records.columns:
+                aggs[col] = (col, "max")
+
+        return records.groupby(["stage", "category"], sort=False).agg(**aggs).reset_index()
+
+    def write_json(self, path: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Writes every recorded stage and the per-stage summary to a JSON metrics file
+
+        Args:
+            path: file to write
+            metadata: extra run details to include, e.g. the command line arguments. Defaults to None.
+        """
+
+        peak_rss = _peak_rss_bytes()
+        metrics = {
+            "started_at": self._started_at.isoformat() if self._started_at else None,
+            "total_s": time.perf_counter() - self._started if self._started is not None else None,
+            "peak_rss_mb": peak_rss / MB if peak_rss is not None else None,
+            "trace_memory": self.trace_memory,
+            "metadata": metadata or {},
+            "summary": json.loads(self.summary().to_json(orient="records")),
+            "stages": self.records,
+        }
+
+        output_dir = os.path.dirname(path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(metrics, f, indent=2, default=str)
+        logger.info(f"wrote {len(self.records)} stage metrics to {path}")
+
+        return None
+
+
+# process-wide recorder used by the pipeline, enabled by gather_player_peaks --metrics-file
+INSTRUMENTATION = Instrumentation()
+
+
+def stage(name: str, **labels: Any):
+    """Times the enclosed block as a named stage of the process-wide recorder, see Instrumentation.stage"""
+
+    return INSTRUMENTATION.stage(name, **labels)
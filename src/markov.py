@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from pandas import DataFrame as PandasDataFrame
+from typing import Tuple
+
+from base_out import NEXT_BASES, OUTS_MADE, RUNS_SCORED, N_BASE_STATES, N_OUTS
+from cards import Outcome
+
+# transient base-out states, indexed outs * N_BASE_STATES + bases; the third out absorbs
+N_STATES = N_OUTS * N_BASE_STATES
+MAX_RUNS_PER_PA = 4
+
+
+def state_index(outs: int, bases: int) -> int:
+    """Index of a base-out state in the Markov chain
+
+    Args:
+        outs: outs in the inning, 0 to 2
+        bases: base occupancy bitmask
+
+    Returns:
+        State index
+    """
+
+    return outs * N_BASE_STATES + bases
+
+
+def transition_matrices(outcome_probs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Builds the base-out Markov chain of an inning in which every plate appearance has the same outcome probabilities
+
+    Args:
+        outcome_probs: probability of each plate appearance outcome, indexed by Outcome value,
+            e.g. from BatterCard.outcome_probs
+
+    Returns:
+        transition probabilities between transient states split by runs scored on the transition,
+        shaped [runs, from state, to state], and the probability of each state ending the inning
+    """
+
+    by_runs = np.zeros((MAX_RUNS_PER_PA + 1, N_STATES, N_STATES))
+    ends_inning = np.zeros(N_STATES)
+    for outs in range(N_OUTS):
+        for bases in range(N_BASE_STATES):
+            state = state_index(outs, bases)
+            for outcome in Outcome:
+                new_outs = outs + OUTS_MADE[outcome]
+                if new_outs == N_OUTS:
+                    ends_inning[state] += outcome_probs[outcome]
+                else:
+                    new_state = state_index(new_outs, NEXT_BASES[bases, outcome])
+                    by_runs[RUNS_SCORED[bases, outcome], state, new_state] += outcome_probs[outcome]
+
+    return by_runs, ends_inning
+
+
+def run_expectancy(outcome_probs: np.ndarray) -> np.ndarray:
+    """Expected runs scored from each base-out state to the end of the inning
+
+    Solves (I - Q) e = r, where Q holds the transient transition probabilities and r the expected
+    runs scored on the next plate appearance.
+
+    Args:
+        outcome_probs: probability of each plate appearance outcome, indexed by Outcome value
+
+    Returns:
+        Expected runs, indexed by state_index
+    """
+
+    by_runs, _ = transition_matrices(outcome_probs)
+    transitions = by_runs.sum(axis=0)
+    expected_pa_runs = np.tensordot(np.arange(MAX_RUNS_PER_PA + 1), by_runs, axes=1).sum(axis=1)
+
+    return np.linalg.solve(np.eye(N_STATES) - transitions, expected_pa_runs)
+
+
+def run_expectancy_table(outcome_probs: np.ndarray) -> PandasDataFrame:
+    """Expected runs to the end of the inning in the classic 24 base-out state layout
+
+    Args:
+        outcome_probs: probability of each plate appearance outcome, indexed by Outcome value
+
+    Returns:
+        Row per base occupancy (e.g. "1_3" for runners on first and third), column per number of outs
+    """
+
+    expectancy = run_expectancy(outcome_probs).reshape(N_OUTS, N_BASE_STATES).T
+    labels = [
+        "".join(str(base) if bases & (1 << (base - 1)) else "_" for base in (1, 2, 3))
+        for bases in range(N_BASE_STATES)
+    ]
+
+    return pd.DataFrame(expectancy, index=labels, columns=list(range(N_OUTS)))
+
+
+def inning_run_distribution(outcome_probs: np.ndarray, max_runs: int = 20, outs: int = 0, bases: int = 0) -> np.ndarray:
+    """Exact probability of scoring each number of runs in the rest of an inning
+
+    With f_k the probability of scoring exactly k more runs from each state, and Q_r the
+    transitions scoring r runs, f_k = (I - Q_0)^-1 (a [k = 0] + sum_r Q_r f_(k - r)), where a is the
+    probability of the next plate appearance ending the inning. One factorization of I - Q_0
+    serves every k.
+
+    Args:
+        outcome_probs: probability of each plate appearance outcome, indexed by Outcome value
+        max_runs: highest run count reported separately. Defaults to 20.
+        outs: outs in the starting state. Defaults to 0.
+        bases: base occupancy bitmask of the starting state. Defaults to 0 (empty).
+
+    Returns:
+        Probability of scoring exactly 0 .. max_runs - 1 runs, with the last entry the probability of scoring max_runs or more
+    """
+
+    by_runs, ends_inning = transition_matrices(outcome_probs)
+    inverse = np.linalg.inv(np.eye(N_STATES) - by_runs[0])
+
+    exactly = np.zeros((max_runs, N_STATES))
+    for k in range(max_runs):
+        rhs = ends_inning.copy() if k == 0 else np.zeros(N_STATES)
+        for runs in range(1, min(k, MAX_RUNS_PER_PA) + 1):
+            rhs += by_runs[runs] @ exactly[k - runs]
+        exactly[k] = inverse @ rhs
+
+    start = state_index(outs, bases)
+    distribution = exactly[:, start]
+
+    return np.r_[distribution, max(1 - distribution.sum(), 0.0)]
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+from pandas import DataFrame as PandasDataFrame
+from typing import Dict, Optional, Sequence, Tuple
+
+PEAK_COLUMNS = ["player_name", "peak_value", "peak_start_year", "peak_end_year"]
+
+# window sums are rounded before picking each player's best window, so that windows
+# with equal true totals tie exactly and the earliest one wins, as with Player
+_SUM_DECIMALS = 9
+
+
+def best_window(stat_vals: np.ndarray, dur: int) -> Tuple[Optional[int], float]:
+    """Finds a single player's highest-valued window of `dur` consecutive seasons
+
+    Windows containing a missing stat value are not considered, as in compute_peaks.
+
+    Args:
+        stat_vals: the player's stat values, in season order
+        dur: number of consecutive seasons defining a peak
+
+    Returns:
+        Position of the first season of the best window, the earliest on ties, and the window's
+        total. None and NaN when every window has a missing value.
+    """
+
+    if not np.issubdtype(stat_vals.dtype, np.floating):
+        window_sums = np.convolve(stat_vals, np.ones(dur, dtype=int), "valid")
+        return int(np.argmax(window_sums)), window_sums.max()
+
+    missing = np.isnan(stat_vals)
+    window_sums = np.convolve(np.where(missing, 0.0, stat_vals), np.ones(dur, dtype=int), "valid")
+    complete = np.convolve(missing, np.ones(dur, dtype=int), "valid") == 0
+    if not complete.any():
+        return None, np.nan
+    loc = int(np.argmax(np.where(complete, window_sums, -np.inf)))
+
+    return loc, window_sums[loc]
+
+
+def compute_peaks(stats: PandasDataFrame, dur: int, stat: str = "WAR") -> PandasDataFrame:
+    """Calculates every player's peak over a concatenated season table in one vectorized pass
+
+    Equivalent to building a Player for each name with at least `dur` seasons and asking for
+    its peak, but without per-player Python work: the table is sorted once, cumulative sums
+    are taken per player, and each player's best window is picked with a single sort.
+
+    Args:
+        stats: row per player-season, with "Name", "Season" and `stat` columns
+        dur: number of consecutive seasons defining a peak
+        stat: statistic defining the peak. Assumes that higher values are better. Defaults to "WAR".
+
+    Returns:
+        Row per player with a career of at least `dur` seasons, sorted by player name, describing their peak.
+        Windows containing a missing stat value are not considered.
+    """
+
+    return compute_peaks_by_duration(stats, [dur], stat)[dur]
+
+
+def compute_peaks_by_duration(stats: PandasDataFrame, durs: Sequence[int], stat: str = "WAR") -> Dict[int, PandasDataFrame]:
+    """Calculates every player's peak for several peak durations, sharing one sort and one set of cumulative sums
+
+    Args:
+        stats: row per player-season, with "Name", "Season" and `stat` columns
+        durs: numbers of consecutive seasons defining a peak
+        stat: statistic defining the peak. Assumes that higher values are better. Defaults to "WAR".
+
+    Returns:
+        Map of duration to the peaks for that duration, as returned by compute_peaks
+    """
+
+    for dur in durs:
+        assert dur >= 1, f"peak duration must be at least 1, received {dur}"
+
+    data = stats[["Name", "Season", stat]].sort_values(by=["Name", "Season"], kind="mergesort")
+    names = data["Name"].to_numpy()
+    seasons = data["Season"].to_numpy()
+    stat_vals = data[stat].to_numpy(dtype=np.float64)
+
+    # player blocks: id of the player owning each row
+    is_first = np.r_[True, names[1:] != names[:-1]] if len(names) else np.zeros(0, dtype=bool)
+    player_ids = np.cumsum(is_first) - 1
+
+    # cumulative sums restarted at each player boundary, so window totals only ever combine
+    # one player's seasons and stay as precise as a per-player sum
+    missing = np.isnan(stat_vals)
+    player_cumsum = pd.Series(np.where(missing, 0.0, stat_vals)).groupby(player_ids).cumsum().to_numpy()
+    missing_cumsum = np.r_[0, np.cumsum(missing)]
+
+    peaks = {}
+    for dur in durs:
+        peaks[dur] = _best_windows(names, seasons, is_first, player_ids, player_cumsum, missing_cumsum, dur)
+
+    return peaks
+
+
+def _best_windows(
+    names: np.ndarray,
+    seasons: np.ndarray,
+    is_first: np.ndarray,
+    player_ids: np.ndarray,
+    player_cumsum: np.ndarray,
+    missing_cumsum: np.ndarray,
+    dur: int,
+) -> PandasDataFrame:
+    """Picks each player's highest-valued window of `dur` seasons from the per-player cumulative sums"""
+
+    n_rows = len(names)
+    if n_rows < dur:
+        return pd.DataFrame(columns=PEAK_COLUMNS)
+
+    # window starting at row i covers rows i .. i + dur - 1
+    window_starts = np.arange(n_rows - dur + 1)
+    window_ends = window_starts + dur - 1
+    before_start = np.where(is_first[window_starts], 0.0, player_cumsum[window_starts - 1])
+    window_sums = np.round(player_cumsum[window_ends] - before_start, _SUM_DECIMALS)
+
+    valid = (
+        (player_ids[window_starts] == player_ids[window_ends])
+        & (missing_cumsum[window_ends + 1] == missing_cumsum[window_starts])
+    )
+    window_starts = window_starts[valid]
+    window_sums = window_sums[valid]
+    window_players = player_ids[window_starts]
+    if len(window_starts) == 0:
+        return pd.DataFrame(columns=PEAK_COLUMNS)
+
+    # best window per player: highest total, earliest start on ties
+    order = np.lexsort((window_starts, -window_sums, window_players))
+    sorted_players = window_players[order]
+    best = order[np.r_[True, sorted_players[1:] != sorted_players[:-1]]]
+    best_starts = window_starts[best]
+
+    return pd.DataFrame({
+        "player_name": names[best_starts],
+        "peak_value": window_sums[best],
+        "peak_start_year": seasons[best_starts],
+        "peak_end_year": seasons[best_starts + dur - 1],
+    })
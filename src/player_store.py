@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+from pandas import DataFrame as PandasDataFrame
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from peak_engine import best_window
+
+
+class PlayerStore:
+
+    def __init__(self, stats: PandasDataFrame):
+        """Every player's seasons in one columnar block, sorted by player and season
+
+        Rows are sorted once, after which each player's seasons occupy a contiguous range of
+        every column, located through an offsets array (player i owns rows offsets[i] to
+        offsets[i + 1]), as in a CSR matrix. Numeric columns are held as contiguous numpy arrays,
+        so PlayerView objects can read a player's stats as array slices, without copying and
+        without a DataFrame per player.
+
+        Args:
+            stats: row per player-season, with "Name" and "Season" columns. Only numeric columns are kept.
+        """
+
+        data = stats.sort_values(by=["Name", "Season"], kind="mergesort")
+        names = data["Name"].to_numpy()
+
+        starts = np.flatnonzero(np.r_[True, names[1:] != names[:-1]]) if len(names) else np.zeros(0, dtype=np.int64)
+        self.player_names = names[starts]
+        self.offsets = np.r_[starts, len(names)].astype(np.int64)
+
+        self.columns: Dict[str, np.ndarray] = {}
+        for col in data.select_dtypes(include="number").columns:
+            values = data[col]
+            if pd.api.types.is_extension_array_dtype(values):
+                values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+            self.columns[col] = np.ascontiguousarray(values)
+        self.seasons = self.columns["Season"]
+
+        self._player_index: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.player_names)
+
+    def __getitem__(self, player_name: str) -> "PlayerView":
+        """View of a player's seasons, by name"""
+
+        if self._player_index is None:
+            self._player_index = {name: i for i, name in enumerate(self.player_names)}
+        return PlayerView(self, self._player_index[player_name])
+
+    def column(self, stat: str) -> np.ndarray:
+        """All players' values of a numeric column, in store order"""
+
+        if stat not in self.columns:
+            raise KeyError(f"{stat} is not a numeric column of the store, available: {sorted(self.columns)}")
+        return self.columns[stat]
+
+    def season_counts(self) -> np.ndarray:
+        """Number of season rows of each player, in store order"""
+
+        return np.diff(self.offsets)
+
+    def players(self, min_seasons: int = 1) -> List["PlayerView"]:
+        """Views of every player with at least `min_seasons` season rows, sorted by player name
+
+        Args:
+            min_seasons: minimum number of seasons a player needs to be included. Defaults to 1.
+
+        Returns:
+            Player views
+        """
+
+        return [PlayerView(self, i) for i in np.flatnonzero(self.season_counts() >= min_seasons)]
+
+
+def _range_sum(values: np.ndarray) -> Union[int, float]:
+    """Sum of a slice, accumulated in 64 bits so downcast columns cannot overflow or lose precision"""
+
+    return values.sum(dtype=np.float64 if np.issubdtype(values.dtype, np.floating) else np.int64)
+
+
+class PlayerView:
+
+    __slots__ = ("store", "player_name", "start", "end", "_peak_def", "_last_peak")
+
+    def __init__(self, store: PlayerStore, index: int):
+        """A player's rows of a PlayerStore, with the peak and counting stat API of Player
+
+        Args:
+            store: store holding the player's seasons
+            index: position of the player in the store
+        """
+
+        self.store = store
+        self.player_name = store.player_names[index]
+        self.start = int(store.offsets[index])
+        self.end = int(store.offsets[index + 1])
+
+        self._peak_def: Optional[Tuple[int, str]] = None
+        self._last_peak: Optional[Tuple[Tuple[int, str], Dict[str, Any]]] = None
+
+    @property
+    def n_seasons(self) -> int:
+        return self.end - self.start
+
+    @property
+    def seasons(self) -> np.ndarray:
+        """Seasons of the player's rows, ascending, as a view into the store"""
+        return self.store.seasons[self.start:self.end]
+
+    def stat_values(self, stat: str) -> np.ndarray:
+        """Values of a numeric stat over the player's rows, in season order, as a view into the store"""
+        return self.store.column(stat)[self.start:self.end]
+
+    @property
+    def player_stats(self) -> PandasDataFrame:
+        """Year-by-year numeric statistics, copied into a new DataFrame for code expecting a Player"""
+        return pd.DataFrame({col: values[self.start:self.end] for col, values in self.store.columns.items()})
+
+    def _peak_stretch_info(self, dur: int, stat: str) -> Dict[str, Any]:
+
+        # the last peak asked for is kept, so the peak value and years share one computation
+        key = (dur, stat)
+        if self._last_peak is not None and self._last_peak[0] == key:
+            return self._last_peak[1]
+
+        assert self.n_seasons >= dur, f"{self.player_name} has {self.n_seasons} seasons, fewer than a {dur} year peak"
+
+        stat_vals = self.stat_values(stat)
+        season_vals = self.seasons
+        windowed_max_loc, windowed_max_val = best_window(stat_vals, dur)
+        has_peak = windowed_max_loc is not None
+
+        info = {
+            "stretch_duration": dur,
+            "stretch_stat": stat,
+            "stretch_value": windowed_max_val,
+            "stretch_start_year": season_vals[windowed_max_loc] if has_peak else None,
+            "stretch_end_year": season_vals[windowed_max_loc + dur - 1] if has_peak else None,
+        }
+        self._last_peak = (key, info)
+
+        return info
+
+    def set_peak(self, dur: int, stat: str = "WAR") -> None:
+        """Sets the definition of the player's peak, used when peak accessors are called without a duration
+
+        Args:
+            dur: length of peak, in years
+            stat: statistic used to define the peak. Defaults to "WAR".
+        """
+
+        self._peak_def = (dur, stat)
+
+        return None
+
+    def _peak(self, dur: Optional[int], stat: str) -> Dict[str, Any]:
+
+        if (self._peak_def is not None) and (dur is None):
+            return self._peak_stretch_info(*self._peak_def)
+        return self._peak_stretch_info(dur, stat)
+
+    def peak_value(self, dur: Optional[int] = None, stat: str = "WAR") -> Union[int, float]:
+        """Peak value of the player, see Player.peak_value"""
+        return self._peak(dur, stat)["stretch_value"]
+
+    def peak_start_year(self, dur: Optional[int] = None, stat: str = "WAR") -> int:
+        """First year of the player's peak, see Player.peak_start_year"""
+        return self._peak(dur, stat)["stretch_start_year"]
+
+    def peak_end_year(self, dur: Optional[int] = None, stat: str = "WAR") -> int:
+        """Last year of the player's peak, see Player.peak_end_year"""
+        return self._peak(dur, stat)["stretch_end_year"]
+
+    def _season_range(self, start_year: int, end_year: int) -> Tuple[int, int]:
+
+        seasons = self.seasons
+        lo = np.searchsorted(seasons, start_year, side="left")
+        hi = np.searchsorted(seasons, end_year, side="right")
+        return self.start + lo, self.start + max(lo, hi)
+
+    def get_counting_stat(self, stat: str, start_year: int, end_year: int) -> Union[int, float]:
+        """Gets total count of a numeric counting stat over a fixed time period for the player
+
+        Args:
+            stat: name of the counting statistic
+            start_year: first year of the time window
+            end_year: last year of the time window
+
+        Returns:
+            Total count of the statistic over the time window
+        """
+
+        lo, hi = self._season_range(start_year, end_year)
+        return _range_sum(self.store.column(stat)[lo:hi])
+
+    def get_counting_stats(self, stats: List[str], start_year: int, end_year: int) -> Dict[str, Union[int, float]]:
+        """Gets total counts of several numeric counting stats over a fixed time period for the player
+
+        Args:
+            stats: names of the counting statistics
+            start_year: first year of the time window
+            end_year: last year of the time window
+
+        Returns:
+            Map of statistic name to its total over the time window
+        """
+
+        lo, hi = self._season_range(start_year, end_year)
+        return {stat: _range_sum(self.store.column(stat)[lo:hi]) for stat in stats}
@@ -1,10 +1,12 @@
 import numpy as np
 import pandas as pd
 from pandas import DataFrame as PandasDataFrame
-from typing import Dict, Any, Union, Optional
+from typing import Dict, Any, List, Union, Optional, Tuple
 import logging
 import sys
 
+from peak_engine import best_window
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(format='%(message)s', level=logging.INFO, stream=sys.stdout)
 
@@ -22,24 +24,49 @@ class Player:
         self.player_name = player_name
         self.player_stats = player_stats
 
-        self._peak_info: Optional[Dict[str, Any]] = None
-        
+        self._peak_def: Optional[Tuple[int, str]] = None
+
+    @property
+    def player_stats(self) -> PandasDataFrame:
+        """Year-by-year player statistics. Replacing them clears any cached peak results and season index."""
+        return self._player_stats
+
+    @player_stats.setter
+    def player_stats(self, player_stats: PandasDataFrame) -> None:
+        self._player_stats = player_stats
+        self._peak_cache: Dict[Tuple[int, str], Dict[str, Any]] = {}
+        self._season_index: Optional[Tuple[np.ndarray, Dict[str, np.ndarray]]] = None
+
+    @property
+    def _peak_info(self) -> Optional[Dict[str, Any]]:
+        if self._peak_def is None:
+            return None
+        return self._peak_stretch_info(*self._peak_def)
+
     def _peak_stretch_info(self, dur: int, stat) -> Dict[str, Any]:
-        
-        data = self.player_stats[["Season", stat]].sort_values(by="Season")
+
+        # peak results are memoized per (duration, stat), so the peak accessors share one computation
+        key = (dur, stat)
+        if key not in self._peak_cache:
+            self._peak_cache[key] = self._calc_peak_stretch_info(dur, stat)
+        return self._peak_cache[key]
+
+    def _calc_peak_stretch_info(self, dur: int, stat) -> Dict[str, Any]:
+
+        data = self.player_stats[["Season", stat]].sort_values(by="Season", kind="mergesort")
         stat_vals = data[stat].values
         season_vals = data["Season"].values
         
-        windowed_stat_vals = np.convolve(stat_vals, np.ones(dur, dtype=int), "valid")
-        windowed_max_loc = np.argmax(windowed_stat_vals)
-        windowed_max_val = np.max(windowed_stat_vals)
+        # windows with a missing value are skipped, leaving no peak when every window has one
+        windowed_max_loc, windowed_max_val = best_window(stat_vals, dur)
+        has_peak = windowed_max_loc is not None
         
         return {
             "stretch_duration": dur,
             "stretch_stat": stat,
             "stretch_value": windowed_max_val,
-            "stretch_start_year": season_vals[windowed_max_loc],
-            "stretch_end_year": season_vals[windowed_max_loc + dur - 1],
+            "stretch_start_year": season_vals[windowed_max_loc] if has_peak else None,
+            "stretch_end_year": season_vals[windowed_max_loc + dur - 1] if has_peak else None,
         }
     
     def set_peak(self, dur: int, stat: str = "WAR") -> None:
@@ -58,10 +85,39 @@ class Player:
                 stretch_end_year: last year of the peak
         """
 
-        self._peak_info = self._peak_stretch_info(dur, stat)
+        self._peak_def = (dur, stat)
+        self._peak_stretch_info(dur, stat)
 
         return None
     
+    def _season_prefix_sums(self) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Lazily builds prefix sums of every numeric column, indexed by season
+
+        Returns:
+            sorted seasons, and a map of column name to prefix sums where entry i is the total over the first i seasons
+        """
+
+        if self._season_index is None:
+            numeric = self.player_stats.select_dtypes(include="number").drop(columns="Season", errors="ignore")
+            by_season = numeric.groupby(self.player_stats["Season"]).sum()
+
+            # accumulate in 64 bits, so downcast columns cannot overflow over a career
+            prefix_sums = {}
+            for col in by_season.columns:
+                vals = by_season[col].to_numpy()
+                acc_dtype = np.float64 if np.issubdtype(vals.dtype, np.floating) else np.int64
+                prefix_sums[col] = np.r_[np.zeros(1, dtype=acc_dtype), np.cumsum(vals, dtype=acc_dtype)]
+            self._season_index = (by_season.index.to_numpy(), prefix_sums)
+
+        return self._season_index
+
+    def _season_range(self, start_year: int, end_year: int) -> Tuple[int, int]:
+
+        seasons, _ = self._season_prefix_sums()
+        lo = np.searchsorted(seasons, start_year, side="left")
+        hi = np.searchsorted(seasons, end_year, side="right")
+        return lo, max(lo, hi)
+
     def get_counting_stat(self, stat: str, start_year: int, end_year: int) -> Union[int, float]:
         """Gets total count of any counting stat over a fixed time period for the player
 
@@ -74,8 +130,33 @@ class Player:
             Total count of the statisttic over the time window
         """
 
-        range_stats = self.player_stats[[s >= start_year and s <= end_year for s in self.player_stats["Season"]]]
-        return range_stats[stat].sum()
+        _, prefix_sums = self._season_prefix_sums()
+        if stat not in prefix_sums:
+            range_stats = self.player_stats[self.player_stats["Season"].between(start_year, end_year)]
+            return range_stats[stat].sum()
+
+        lo, hi = self._season_range(start_year, end_year)
+        return prefix_sums[stat][hi] - prefix_sums[stat][lo]
+
+    def get_counting_stats(self, stats: List[str], start_year: int, end_year: int) -> Dict[str, Union[int, float]]:
+        """Gets total counts of several counting stats over a fixed time period for the player
+
+        Args:
+            stats: names of the counting statistics
+            start_year: first year of the time window
+            end_year: last year of the time window
+
+        Returns:
+            Map of statistic name to its total over the time window
+        """
+
+        _, prefix_sums = self._season_prefix_sums()
+        lo, hi = self._season_range(start_year, end_year)
+        return {
+            stat: prefix_sums[stat][hi] - prefix_sums[stat][lo] if stat in prefix_sums
+            else self.get_counting_stat(stat, start_year, end_year)
+            for stat in stats
+        }
     
     def peak_value(self, dur: Optional[int] = None, stat: str = "WAR") -> Union[int, float]:
         """Peak value of a player in terms of the specified statistic over the specified time window
@@ -85,7 +166,7 @@ class Player:
             stat: Statistic defining peak. Defaults to "WAR".
 
         Returns:
-            Aggregate value over the peak
+            Aggregate value over the peak, skipping windows with a missing value. NaN if every window has one.
         """
         if (self._peak_info is not None) and (dur is None):
             return self._peak_info["stretch_value"]
@@ -99,7 +180,7 @@ class Player:
             stat: Statistic defining the peak. Defaults to "WAR".
 
         Returns:
-            First year of the peak
+            First year of the peak. None if every window has a missing value.
         """
         if (self._peak_info is not None) and (dur is None):
             return self._peak_info["stretch_start_year"]
@@ -113,7 +194,7 @@ class Player:
             stat: Statistic defining the peak. Defaults to "WAR".
 
         Returns:
-            Last year of the peak
+            Last year of the peak. None if every window has a missing value.
         """
         if (self._peak_info is not None) and (dur is None):
             return self._peak_info["stretch_end_year"]
@@ -122,6 +203,9 @@ class Player:
 
 class PeakBatter(Player):
 
+    # counting stats read over the peak, beyond those defining it
+    COUNTING_STATS = ("AB", "PA", "BB", "HBP", "1B", "2B", "3B", "HR")
+
     def __init__(self, player_name: str, player_stats: PandasDataFrame, peak_dur: int = 5, peak_stat: str = "WAR"):
         
         super().__init__(player_name, player_stats)
@@ -129,11 +213,28 @@ class PeakBatter(Player):
 
     @property
     def free_base_rate(self) -> float:
-        bb = self.get_counting_stat("BB", self.peak_start_year(), self.peak_end_year())
-        hbp = self.get_counting_stat("HBP", self.peak_start_year(), self.peak_end_year())
-        ab = self.get_counting_stat("AB", self.peak_start_year(), self.peak_end_year())
-        return (bb + hbp) / (max([ab, 1]))
+        counts = self.get_counting_stats(["BB", "HBP", "AB"], self.peak_start_year(), self.peak_end_year())
+        return (counts["BB"] + counts["HBP"]) / (max([counts["AB"], 1]))
+
+    @property
+    def outcome_rates(self) -> Dict[str, float]:
+        """Per plate appearance rate of each plate appearance outcome over the player's peak
 
+        Returns:
+            Map of outcome (walk, which includes HBP, single, double, triple, home_run, out) to its rate
+        """
+
+        counts = self.get_counting_stats(["PA", "BB", "HBP", "1B", "2B", "3B", "HR"], self.peak_start_year(), self.peak_end_year())
+        pa = max([counts["PA"], 1])
+        rates = {
+            "walk": (counts["BB"] + counts["HBP"]) / pa,
+            "single": counts["1B"] / pa,
+            "double": counts["2B"] / pa,
+            "triple": counts["3B"] / pa,
+            "home_run": counts["HR"] / pa,
+        }
+        rates["out"] = max([1 - sum(rates.values()), 0])
+        return rates
 
 
 class Pitcher(Player):
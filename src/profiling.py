@@ -0,0 +1,162 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s', level=logging.INFO, stream=sys.stdout)
+
+
+class StackSampler:
+
+    def __init__(self, interval: float = 0.005):
+        """Samples the call stack of every thread at a fixed interval
+
+        cProfile only sees the thread it is enabled on, so work done on fetch threads is invisible
+        to it. Sampling sys._current_frames from a background thread covers all of them, at the
+        cost of statistical rather than exact counts.
+
+        Args:
+            interval: seconds between samples. Defaults to 0.005.
+        """
+
+        self.interval = interval
+        # sample counts keyed by thread name and call stack, as (file, first line, function) from outermost frame to innermost
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                self.samples[(names.get(thread_id, str(thread_id)), tuple(reversed(stack)))] += 1
+
+        return None
+
+    def start(self) -> None:
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+        return None
+
+    def stop(self) -> None:
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+        return None
+
+    def report(self, top: int = 30) -> str:
+        """Functions holding the most samples, by inclusive time (anywhere on the stack) and self time (innermost frame)
+
+        Args:
+            top: number of functions listed in each ranking. Defaults to 30.
+
+        Returns:
+            Report text
+        """
+
+        total = sum(self.samples.values())
+        inclusive, own, threads = Counter(), Counter(), Counter()
+        for (thread, stack), count in self.samples.items():
+            threads[thread] += count
+            for func in set(stack):
+                inclusive[func] += count
+            if stack:
+                own[stack[-1]] += count
+
+        lines = [f"{total} samples every {self.interval * 1000:.1f} ms", "", "samples by thread:"]
+        lines += [f"{count:8d} {100 * count / total:6.1f}%  {thread}" for thread, count in threads.most_common()]
+        for title, counts in (("inclusive", inclusive), ("self", own)):
+            lines += ["", f"top {top} functions by {title} samples:"]
+            lines += [
+                f"{count:8d} {100 * count / total:6.1f}%  {name} ({filename}:{line})"
+                for (filename, line, name), count in counts.most_common(top)
+            ]
+
+        return "\n".join(lines) + "\n"
+
+    def write_folded(self, path: str) -> None:
+        """Writes the samples as collapsed stacks, one "thread;outer;...;inner count" line per stack, for flame graph tools
+
+        Args:
+            path: file to write
+        """
+
+        with open(path, "w") as f:
+            for (thread, stack), count in self.samples.most_common():
+                frames = ";".join(f"{name} ({os.path.basename(filename)}:{line})" for filename, line, name in stack)
+                f.write(f"{thread};{frames} {count}\n")
+
+        return None
+
+
+@contextmanager
+def profiled(output_dir: str, name: str = "profile", top: int = 30, sample_interval: Optional[float] = 0.005) -> Iterator[None]:
+    """Profiles the enclosed block, writing the reports to a directory
+
+    Writes <name>.prof (a cProfile dump for pstats, snakeviz, etc.), <name>_top.txt (the top
+    functions by cumulative time, from cProfile) and, when sampling, <name>_samples.txt (the top
+    functions by samples across all threads) and <name>.folded (collapsed stacks for flame graphs).
+
+    Args:
+        output_dir: directory to write the reports to
+        name: base name of the report files. Defaults to "profile".
+        top: number of functions listed in the reports. Defaults to 30.
+        sample_interval: seconds between stack samples, or None to only run cProfile. Defaults to 0.005.
+    """
+
+    sampler = StackSampler(sample_interval) if sample_interval else None
+    profiler = cProfile.Profile()
+
+    if sampler is not None:
+        sampler.start()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        if sampler is not None:
+            sampler.stop()
+
+        os.makedirs(output_dir, exist_ok=True)
+        base = os.path.join(output_dir, name)
+        profiler.dump_stats(base + ".prof")
+
+        report = io.StringIO()
+        report.write(f"profiled {elapsed:.3f}s on the main thread\n")
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(top)
+        with open(base + "_top.txt", "w") as f:
+            f.write(report.getvalue())
+        written = [base + ".prof", base + "_top.txt"]
+
+        if sampler is not None:
+            with open(base + "_samples.txt", "w") as f:
+                f.write(sampler.report(top))
+            sampler.write_folded(base + ".folded")
+            written += [base + "_samples.txt", base + ".folded"]
+
+        logger.info(f"wrote profile reports: {', '.join(written)}")
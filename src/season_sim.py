@@ -0,0 +1,141 @@
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame as PandasDataFrame
+from typing import Dict, List, Optional, Sequence
+
+from cards import BatterCard
+from dice import spawn_rngs
+from game_sim import simulate_games
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s', level=logging.INFO, stream=sys.stdout)
+
+SEASON_STATS = ["wins", "losses", "runs_scored", "runs_allowed"]
+
+
+def _simulate_season_shard(
+    lineups: List[Sequence[BatterCard]],
+    home_games: int,
+    n_seasons: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Simulates a batch of independent seasons, keeping only per-team totals
+
+    Every team hosts every other team `home_games` times per season. Each pairing's games for all
+    the seasons in the batch are simulated in one call, then folded into season totals.
+
+    Args:
+        lineups: batter cards of each team, in batting order
+        home_games: games each team hosts against each other team per season
+        n_seasons: number of seasons
+        rng: numpy random generator for the batch
+
+    Returns:
+        Totals shaped [season, team, stat], with stats ordered as SEASON_STATS
+    """
+
+    n_teams = len(lineups)
+    totals = np.zeros((n_seasons, n_teams, len(SEASON_STATS)), dtype=np.int32)
+    for home in range(n_teams):
+        for away in range(n_teams):
+            if home == away:
+                continue
+            games = simulate_games(lineups[away], lineups[home], n_seasons * home_games, rng)
+            home_runs = games["home_runs"].to_numpy().reshape(n_seasons, home_games)
+            away_runs = games["away_runs"].to_numpy().reshape(n_seasons, home_games)
+
+            # games called tied count as neither a win nor a loss
+            home_wins = (home_runs > away_runs).sum(axis=1)
+            away_wins = (away_runs > home_runs).sum(axis=1)
+            totals[:, home] += np.stack([home_wins, away_wins, home_runs.sum(axis=1), away_runs.sum(axis=1)], axis=1)
+            totals[:, away] += np.stack([away_wins, home_wins, away_runs.sum(axis=1), home_runs.sum(axis=1)], axis=1)
+
+    return totals
+
+
+def simulate_seasons(
+    lineups: Dict[str, Sequence[BatterCard]],
+    n_seasons: int,
+    home_games: int = 9,
+    workers: Optional[int] = None,
+    seed: Optional[int] = None,
+    seasons_per_shard: int = 100,
+) -> PandasDataFrame:
+    """Simulates many seasons of a league, sharded across a process pool
+
+    Seasons are split into shards of `seasons_per_shard`, each simulated by a worker process with
+    its own random stream spawned from `seed`. Workers send back only per-team season totals,
+    which are placed by shard, so results depend on the seed but not on the number of workers.
+
+    Args:
+        lineups: map of team name to its batter cards, in batting order
+        n_seasons: number of seasons to simulate
+        home_games: games each team hosts against each other team per season. Defaults to 9.
+        workers: worker processes. Defaults to the number of CPUs; 1 runs in this process.
+        seed: root seed for the random streams. Defaults to None (seeded from the OS).
+        seasons_per_shard: seasons simulated per task. Defaults to 100.
+
+    Returns:
+        Row per season and team, with wins, losses, runs scored and runs allowed
+    """
+
+    teams = list(lineups)
+    team_lineups = [lineups[team] for team in teams]
+    workers = workers or os.cpu_count() or 1
+
+    shard_starts = list(range(0, n_seasons, seasons_per_shard))
+    shard_sizes = [min(seasons_per_shard, n_seasons - start) for start in shard_starts]
+    rngs = spawn_rngs(seed, len(shard_starts))
+    totals = np.zeros((n_seasons, len(teams), len(SEASON_STATS)), dtype=np.int32)
+
+    logger.info(f"simulating {n_seasons} seasons of {len(teams)} teams in {len(shard_starts)} shards on {workers} workers")
+    if workers == 1:
+        for start, size, rng in zip(shard_starts, shard_sizes, rngs):
+            totals[start:start + size] = _simulate_season_shard(team_lineups, home_games, size, rng)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(_simulate_season_shard, team_lineups, home_games, size, rng): (start, size)
+                for start, size, rng in zip(shard_starts, shard_sizes, rngs)
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                start, size = futures[future]
+                totals[start:start + size] = future.result()
+                logger.info(f"finished {done} of {len(futures)} shards")
+
+    seasons = np.repeat(np.arange(n_seasons), len(teams))
+    results = pd.DataFrame(totals.reshape(-1, len(SEASON_STATS)), columns=SEASON_STATS)
+    results.insert(0, "team", np.tile(teams, n_seasons))
+    results.insert(0, "season", seasons)
+
+    return results
+
+
+def summarize_seasons(results: PandasDataFrame) -> PandasDataFrame:
+    """Distribution of each team's season results
+
+    Args:
+        results: row per season and team, from simulate_seasons
+
+    Returns:
+        Row per team with the mean, standard deviation and 5th/50th/95th percentiles of wins and runs,
+        and the share of seasons finishing with the most wins (ties shared)
+    """
+
+    most_wins = results.groupby("season")["wins"].transform("max")
+    leaders = results["wins"] == most_wins
+    leader_share = leaders / leaders.groupby(results["season"]).transform("sum")
+
+    grouped = results.assign(first_place=leader_share).groupby("team", sort=False)
+    summary = grouped[["wins", "runs_scored", "runs_allowed"]].agg(["mean", "std"])
+    summary.columns = [f"{stat}_{agg}" for stat, agg in summary.columns]
+    for q in (0.05, 0.5, 0.95):
+        summary[f"wins_p{int(q * 100)}"] = grouped["wins"].quantile(q)
+    summary["first_place_share"] = grouped["first_place"].mean()
+
+    return summary.reset_index()
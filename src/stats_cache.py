@@ -0,0 +1,138 @@
+import datetime
+import json
+import logging
+import os
+import sys
+import threading
+
+import pandas as pd
+from pandas import DataFrame as PandasDataFrame
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s', level=logging.INFO, stream=sys.stdout)
+
+
+class SeasonStatsCache:
+
+    MANIFEST_FILE = "manifest.json"
+
+    def __init__(self, cache_dir: str, refresh_years: Optional[Iterable[int]] = None):
+        """On-disk cache of raw per-season stats tables
+
+        Each category-season is stored as its own Parquet file, falling back to pickle for
+        tables that Arrow cannot represent, and a JSON manifest records what has been stored.
+        Seasons that were still in progress when fetched are refetched on the next run;
+        closed seasons are only refetched when listed in `refresh_years`.
+
+        Args:
+            cache_dir: directory holding the cached tables and manifest
+            refresh_years: seasons to refetch even if cached. Defaults to None.
+        """
+
+        self.cache_dir = cache_dir
+        self.refresh_years = set(refresh_years or [])
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._manifest = self._read_manifest()
+
+    @property
+    def _manifest_path(self) -> str:
+        return os.path.join(self.cache_dir, self.MANIFEST_FILE)
+
+    def _read_manifest(self) -> Dict[str, Dict[str, Any]]:
+
+        if not os.path.exists(self._manifest_path):
+            return {}
+        with open(self._manifest_path) as f:
+            return json.load(f)
+
+    def _write_manifest(self) -> None:
+
+        # write to a temporary file first, so an interrupted run never leaves a truncated manifest
+        tmp_path = self._manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self._manifest_path)
+
+        return None
+
+    def get(self, category: str, year: int) -> Optional[PandasDataFrame]:
+        """Reads a season's stats from the cache
+
+        Args:
+            category: kind of stats, e.g. "batting" or "pitching"
+            year: season
+
+        Returns:
+            The cached stats table, or None if the season must be fetched
+        """
+
+        with self._lock:
+            entry = self._manifest.get(f"{category}/{year}")
+        if (entry is None) or (not entry["complete"]) or (year in self.refresh_years):
+            return None
+
+        path = os.path.join(self.cache_dir, entry["file"])
+        if not os.path.exists(path):
+            return None
+        if entry["format"] == "parquet":
+            return pd.read_parquet(path)
+        return pd.read_pickle(path)
+
+    def put(self, category: str, year: int, stats: PandasDataFrame) -> None:
+        """Writes a season's stats to the cache
+
+        Args:
+            category: kind of stats, e.g. "batting" or "pitching"
+            year: season
+            stats: stats table for the season
+        """
+
+        file_stem = f"{category}_{year}"
+        try:
+            file_name, file_format = file_stem + ".parquet", "parquet"
+            stats.to_parquet(os.path.join(self.cache_dir, file_name), index=False)
+        except (ImportError, ValueError, TypeError) as e:
+            logger.info(f"could not cache {category} stats for {year} as parquet ({e}), using pickle")
+            file_name, file_format = file_stem + ".pkl", "pickle"
+            stats.to_pickle(os.path.join(self.cache_dir, file_name))
+
+        with self._lock:
+            self._manifest[f"{category}/{year}"] = {
+                "file": file_name,
+                "format": file_format,
+                "rows": int(stats.shape[0]),
+                "fetched_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                "complete": year < datetime.date.today().year,
+            }
+            self._write_manifest()
+
+        return None
+
+    def wrap(
+        self,
+        category: str,
+        fetcher: Callable[[int], PandasDataFrame],
+    ) -> Callable[[int], PandasDataFrame]:
+        """Wraps a season fetcher so it reads through the cache
+
+        Args:
+            category: kind of stats the fetcher returns, e.g. "batting" or "pitching"
+            fetcher: fetches the stats table for one season
+
+        Returns:
+            Fetcher that returns cached seasons, and fetches and caches the rest
+        """
+
+        def fetch(year: int) -> PandasDataFrame:
+            stats = self.get(category, year)
+            if stats is not None:
+                logger.info(f"read {category} stats for {year} from cache")
+                return stats
+            stats = fetcher(year)
+            self.put(category, year, stats)
+            return stats
+
+        return fetch
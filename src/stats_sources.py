@@ -0,0 +1,346 @@
+import logging
+import os
+import sys
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from pandas import DataFrame as PandasDataFrame
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from instrumentation import stage
+from stats_cache import SeasonStatsCache
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s', level=logging.INFO, stream=sys.stdout)
+
+# fetches the stats table for a single season
+SeasonFetcher = Callable[[int], PandasDataFrame]
+
+CATEGORIES = ("batters", "pitchers")
+
+
+def _check_category(category: str) -> None:
+
+    assert category in CATEGORIES, \
+        f"category must be one of 'batters' or 'pitchers', received {category}"
+
+    return None
+
+
+def _select(stats: PandasDataFrame, years: Sequence[int], columns: Optional[Sequence[str]]) -> PandasDataFrame:
+    """Rows of the requested seasons and, when given, the requested columns that exist, in that order"""
+
+    stats = stats[stats["Season"].isin(list(years))]
+    if columns is not None:
+        stats = stats[[col for col in columns if col in stats.columns]]
+
+    return stats.reset_index(drop=True)
+
+
+class StatsSource(ABC):
+
+    @abstractmethod
+    def load(self, category: str, years: Sequence[int], columns: Optional[Sequence[str]] = None) -> PandasDataFrame:
+        """Loads the season stats of a player category in bulk
+
+        Args:
+            category: batters or pitchers
+            years: seasons to load
+            columns: columns to keep, where available. Defaults to None (keep all).
+
+        Returns:
+            Dataframe with a row per player-year, with at least "Name" and "Season" columns
+        """
+
+
+def _log_pruned(label: str, n_kept: int, raw_bytes: int, pruned_bytes: int) -> None:
+
+    logger.info(f"pruned {label} stats to {n_kept} columns: {raw_bytes / 1e6:.1f} MB -> {pruned_bytes / 1e6:.1f} MB")
+
+    return None
+
+
+def _fetch_pitching_season(year: int) -> PandasDataFrame:
+    import pybaseball as bb
+    return bb.pitching_stats(year, qual=1)
+
+
+def _fetch_batting_season(year: int) -> PandasDataFrame:
+    import pybaseball as bb
+    return bb.batting_stats(year, qual=1)
+
+
+def _fetch_seasons(
+    fetcher: SeasonFetcher,
+    years: Iterable[int],
+    label: str,
+    workers: int = 1,
+    columns: Optional[Sequence[str]] = None,
+) -> List[PandasDataFrame]:
+    """Fetches the stats table of each season, optionally over a bounded thread pool
+
+    Args:
+        fetcher: fetches the stats table for one season
+        years: seasons to fetch
+        label: kind of stats being fetched, for logging
+        workers: maximum number of seasons fetched at once. Defaults to 1 (sequential).
+        columns: columns to keep from each season, dropping the rest as soon as it is fetched. Defaults to None (keep all).
+
+    Returns:
+        One stats table per season, in the order of `years` regardless of completion order
+    """
+
+    raw_bytes = []
+
+    def fetch(year: int) -> PandasDataFrame:
+        logger.info(f"loading {label} stats for {year}")
+        stats = fetcher(year)
+        if columns is not None:
+            raw_bytes.append(stats.memory_usage(deep=True).sum())
+            stats = stats[[col for col in columns if col in stats.columns]]
+        return stats
+
+    if workers <= 1:
+        stats_by_year = [fetch(year) for year in years]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            stats_by_year = list(pool.map(fetch, years))
+
+    if columns is not None:
+        pruned_bytes = sum(stats.memory_usage(deep=True).sum() for stats in stats_by_year)
+        kept = set().union(*(stats.columns for stats in stats_by_year))
+        _log_pruned(label, len(kept), sum(raw_bytes), pruned_bytes)
+
+    return stats_by_year
+
+
+class PybaseballSource(StatsSource):
+
+    # per category: cache category, log label and default season fetcher
+    FETCHERS = {
+        "batters": ("batting", "batting", _fetch_batting_season),
+        "pitchers": ("pitching", "pitcher", _fetch_pitching_season),
+    }
+
+    def __init__(
+        self,
+        fetch_workers: int = 1,
+        cache: Optional[SeasonStatsCache] = None,
+        fetchers: Optional[Dict[str, SeasonFetcher]] = None,
+    ):
+        """Season stats fetched from FanGraphs through pybaseball, one request per season
+
+        Args:
+            fetch_workers: number of seasons to fetch concurrently. Defaults to 1.
+            cache: on-disk cache of raw season stats, consulted before fetching. Defaults to None.
+            fetchers: map of category to a season fetcher replacing pybaseball, e.g. for offline
+                runs. Defaults to None.
+        """
+
+        self.fetch_workers = fetch_workers
+        self.cache = cache
+        self.fetchers = fetchers or {}
+
+    def load(self, category: str, years: Sequence[int], columns: Optional[Sequence[str]] = None) -> PandasDataFrame:
+
+        _check_category(category)
+        cache_category, label, default_fetcher = self.FETCHERS[category]
+        fetcher = self.fetchers.get(category, default_fetcher)
+        if self.cache is not None:
+            fetcher = self.cache.wrap(cache_category, fetcher)
+
+        def timed_fetcher(year: int) -> PandasDataFrame:
+            with stage("season_fetch", category=category, season=year):
+                return fetcher(year)
+
+        stats_by_year = _fetch_seasons(timed_fetcher, years, label, self.fetch_workers, columns)
+
+        with stage("concat", category=category):
+            return pd.concat(stats_by_year).reset_index(drop=True)
+
+
+class DirectorySource(StatsSource):
+
+    EXTENSIONS = (".parquet", ".csv", ".tsv")
+
+    def __init__(self, stats_dir: str):
+        """Season stats stored locally as one table per category, e.g. exported from earlier pybaseball pulls
+
+        Each category is read from <stats_dir>/<category>.parquet, .csv or .tsv, the first found.
+        Parquet files are read with only the requested columns and seasons, so unneeded data is
+        never loaded.
+
+        Args:
+            stats_dir: directory holding batters.<ext> and pitchers.<ext>
+        """
+
+        self.stats_dir = stats_dir
+
+    def _path(self, category: str) -> str:
+
+        for ext in self.EXTENSIONS:
+            path = os.path.join(self.stats_dir, category + ext)
+            if os.path.exists(path):
+                return path
+        raise FileNotFoundError(f"no {category} stats in {self.stats_dir}, expected {category} with one of {self.EXTENSIONS}")
+
+    def load(self, category: str, years: Sequence[int], columns: Optional[Sequence[str]] = None) -> PandasDataFrame:
+
+        _check_category(category)
+        path = self._path(category)
+        logger.info(f"loading {category} stats from {path}")
+
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            available = pq.read_schema(path).names
+            read_columns = None if columns is None else [col for col in available if col in columns or col == "Season"]
+            stats = pd.read_parquet(path, columns=read_columns, filters=[("Season", "in", list(years))])
+        else:
+            usecols = None if columns is None else (lambda col: col in columns or col == "Season")
+            stats = pd.read_csv(path, sep="\t" if path.endswith(".tsv") else ",", usecols=usecols)
+
+        stats = _select(stats, years, columns)
+        if columns is not None:
+            # unrequested columns are never read, so there is no unpruned size to compare against
+            logger.info(f"read {category} stats with {stats.shape[1]} columns: {stats.memory_usage(deep=True).sum() / 1e6:.1f} MB")
+
+        return stats
+
+
+class LahmanSource(StatsSource):
+
+    # Lahman table of each category, and the Baseball-Reference WAR file matching it
+    TABLES = {
+        "batters": ("Batting.csv", "war_daily_bat.txt"),
+        "pitchers": ("Pitching.csv", "war_daily_pitch.txt"),
+    }
+    # per-stint rates, which cannot be summed: ERA is recomputed from ER and IPouts, and BAOpp
+    # (opponents' at bats are not recorded) is dropped
+    RATE_COLUMNS = ("ERA", "BAOpp")
+
+    def __init__(self, lahman_dir: str, war_dir: Optional[str] = None):
+        """Season stats from the Lahman database CSVs
+
+        Lahman rows are per team stint, keyed by playerID and yearID. Stints are summed into one
+        row per player-season (rate stats are recomputed from the summed counts, or dropped),
+        yearID becomes Season, names come from People.csv and the FanGraphs-style columns used
+        downstream (1B, PA, IP) are derived. Lahman carries no WAR, so
+        it is joined from Baseball-Reference's war_daily_bat.txt / war_daily_pitch.txt when
+        `war_dir` is given, matched on People.csv's bbrefID.
+
+        Args:
+            lahman_dir: directory holding People.csv, Batting.csv and Pitching.csv
+            war_dir: directory holding the Baseball-Reference WAR files. Defaults to None (no WAR column).
+        """
+
+        self.lahman_dir = lahman_dir
+        self.war_dir = war_dir
+
+    def _people(self) -> PandasDataFrame:
+
+        people = pd.read_csv(os.path.join(self.lahman_dir, "People.csv"), usecols=["playerID", "bbrefID", "nameFirst", "nameLast"])
+        people["Name"] = people["nameFirst"].fillna("") + " " + people["nameLast"].fillna("")
+        people["Name"] = people["Name"].str.strip()
+
+        return people[["playerID", "bbrefID", "Name"]]
+
+    def _war(self, war_file: str, years: Sequence[int]) -> PandasDataFrame:
+
+        war = pd.read_csv(os.path.join(self.war_dir, war_file), usecols=["player_ID", "year_ID", "WAR"])
+        war["WAR"] = pd.to_numeric(war["WAR"], errors="coerce")
+        war = war[war["year_ID"].isin(list(years))]
+
+        return war.groupby(["player_ID", "year_ID"], as_index=False)["WAR"].sum(min_count=1)
+
+    def load(self, category: str, years: Sequence[int], columns: Optional[Sequence[str]] = None) -> PandasDataFrame:
+
+        _check_category(category)
+        table, war_file = self.TABLES[category]
+        path = os.path.join(self.lahman_dir, table)
+        logger.info(f"loading {category} stats from {path}")
+
+        stints = pd.read_csv(path)
+        stints = stints[stints["yearID"].isin(list(years))]
+        # only counting stats add up across stints, rate stats are recomputed from the totals or dropped
+        counting = stints.select_dtypes(include="number").columns.drop(["yearID", "stint", *self.RATE_COLUMNS], errors="ignore")
+        stats = stints.groupby(["playerID", "yearID"], as_index=False)[list(counting)].sum()
+        stats = stats.merge(self._people(), on="playerID", how="left").rename(columns={"yearID": "Season"})
+
+        if category == "batters":
+            stats["1B"] = stats["H"] - stats["2B"] - stats["3B"] - stats["HR"]
+            # blanks (e.g. sacrifice flies before they were tracked) count as zero
+            stats["PA"] = stats[[col for col in ["AB", "BB", "HBP", "SH", "SF"] if col in stats.columns]].sum(axis=1).astype("int64")
+        elif "IPouts" in stats.columns:
+            stats["IP"] = stats["IPouts"] // 3 + (stats["IPouts"] % 3) / 10
+            if "ER" in stats.columns:
+                # undefined without an out recorded, as Lahman leaves it
+                stats["ERA"] = (27 * stats["ER"] / stats["IPouts"].where(stats["IPouts"] > 0)).round(2)
+
+        if self.war_dir is not None:
+            war = self._war(war_file, years)
+            stats = stats.merge(war, left_on=["bbrefID", "Season"], right_on=["player_ID", "year_ID"], how="left")
+            stats = stats.drop(columns=["player_ID", "year_ID"])
+
+        if columns is None:
+            return _select(stats, years, columns)
+
+        # the whole table is read, so pruning saves memory only from here on
+        raw_bytes = stats.memory_usage(deep=True).sum()
+        stats = _select(stats, years, columns)
+        _log_pruned(category, stats.shape[1], raw_bytes, stats.memory_usage(deep=True).sum())
+
+        return stats
+
+
+class InMemorySource(StatsSource):
+
+    def __init__(self, tables: Dict[str, PandasDataFrame]):
+        """Season stats held in memory, e.g. test fixtures or synthetic_stats tables
+
+        Args:
+            tables: map of category to its row per player-year
+        """
+
+        self.tables = tables
+
+    def load(self, category: str, years: Sequence[int], columns: Optional[Sequence[str]] = None) -> PandasDataFrame:
+
+        _check_category(category)
+
+        return _select(self.tables[category], years, columns)
+
+
+def make_stats_source(
+    source: str,
+    stats_dir: Optional[str] = None,
+    fetch_workers: int = 1,
+    cache: Optional[SeasonStatsCache] = None,
+    war_dir: Optional[str] = None,
+) -> StatsSource:
+    """Builds a stats source from its command line name
+
+    Args:
+        source: "pybaseball", "directory" or "lahman"
+        stats_dir: directory read by the directory and lahman sources. Defaults to None.
+        fetch_workers: number of seasons fetched concurrently by pybaseball. Defaults to 1.
+        cache: on-disk cache of raw season stats used with pybaseball. Defaults to None.
+        war_dir: directory of Baseball-Reference WAR files, required with lahman. Defaults to None.
+
+    Returns:
+        Stats source
+    """
+
+    assert source in {"pybaseball", "directory", "lahman"}, \
+        f"source must be one of 'pybaseball', 'directory' or 'lahman', received {source}"
+
+    if source == "pybaseball":
+        return PybaseballSource(fetch_workers, cache)
+
+    assert stats_dir is not None, f"the {source} stats source needs a stats directory"
+    if source == "directory":
+        return DirectorySource(stats_dir)
+    # peaks are WAR-based, and Lahman has WAR only through the Baseball-Reference files
+    assert war_dir is not None, "the lahman stats source needs a directory of Baseball-Reference WAR files"
+    return LahmanSource(stats_dir, war_dir)
@@ -0,0 +1,186 @@
+import time
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame as PandasDataFrame
+from typing import Callable, Optional
+
+TEAMS = [
+    "ARI", "ATL", "BAL", "BOS", "CHC", "CHW", "CIN", "CLE", "COL", "DET",
+    "HOU", "KCR", "LAA", "LAD", "MIA", "MIL", "MIN", "NYM", "NYY", "OAK",
+    "PHI", "PIT", "SDP", "SEA", "SFG", "STL", "TBR", "TEX", "TOR", "WSN",
+]
+
+
+def career_lengths(
+    n_players: int,
+    mean_seasons: float = 8.0,
+    distribution: str = "geometric",
+    max_seasons: int = 25,
+    rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
+    """Draws the number of seasons in each player's career
+
+    Args:
+        n_players: number of players
+        mean_seasons: average career length, before capping at `max_seasons`. Defaults to 8.
+        distribution: "geometric" (many short careers, a long tail), "poisson" (careers bunched
+            around the mean) or "fixed" (every career the mean). Defaults to "geometric".
+        max_seasons: longest career. Defaults to 25.
+        rng: numpy random generator. Defaults to a freshly seeded generator.
+
+    Returns:
+        Career length of each player, from 1 to `max_seasons`
+    """
+
+    assert distribution in {"geometric", "poisson", "fixed"}, \
+        f"distribution must be one of 'geometric', 'poisson' or 'fixed', received {distribution}"
+
+    rng = rng if rng is not None else np.random.default_rng()
+    if distribution == "geometric":
+        lengths = rng.geometric(1 / max(mean_seasons, 1), size=n_players)
+    elif distribution == "poisson":
+        lengths = 1 + rng.poisson(max(mean_seasons - 1, 0), size=n_players)
+    else:
+        lengths = np.full(n_players, round(mean_seasons))
+
+    return np.clip(lengths, 1, max_seasons)
+
+
+def _batting_columns(n_rows: int, rng: np.random.Generator) -> dict:
+    """Internally consistent batting lines: PA = AB + BB + HBP and H = 1B + 2B + 3B + HR"""
+
+    pa = rng.integers(50, 700, size=n_rows)
+    bb = rng.binomial(pa, 0.085)
+    hbp = rng.binomial(pa, 0.01)
+    ab = pa - bb - hbp
+    hits = rng.binomial(ab, 0.26)
+    singles, doubles, triples, home_runs = rng.multinomial(hits, [0.68, 0.2, 0.02, 0.1]).T
+
+    return {
+        "G": np.minimum(pa // 4 + rng.integers(0, 10, size=n_rows), 162),
+        "AB": ab,
+        "PA": pa,
+        "H": hits,
+        "1B": singles,
+        "2B": doubles,
+        "3B": triples,
+        "HR": home_runs,
+        "BB": bb,
+        "HBP": hbp,
+        "AVG": np.round(hits / np.maximum(ab, 1), 3),
+    }
+
+
+def _pitching_columns(n_rows: int, rng: np.random.Generator) -> dict:
+    """Pitching lines with innings pitched in FanGraphs' thirds notation (e.g. 180.2)"""
+
+    games = rng.integers(5, 70, size=n_rows)
+    starts = np.where(rng.random(n_rows) < 0.4, games // 2, 0)
+    outs = rng.integers(15, 650, size=n_rows)
+    earned_runs = rng.binomial(outs, 0.15)
+
+    return {
+        "W": rng.binomial(games, 0.25),
+        "L": rng.binomial(games, 0.22),
+        "G": games,
+        "GS": starts,
+        "IP": outs // 3 + (outs % 3) / 10,
+        "ERA": np.round(27 * earned_runs / outs, 2),
+        "SO": rng.binomial(outs, 0.3),
+        "BB": rng.binomial(outs, 0.11),
+    }
+
+
+def synthetic_stats(
+    n_rows: int,
+    category: str = "batters",
+    mean_seasons: float = 8.0,
+    career_distribution: str = "geometric",
+    name_collision_rate: float = 0.0,
+    start_year: int = 1900,
+    end_year: int = 2020,
+    seed: int = 0,
+    shuffle: bool = True,
+) -> PandasDataFrame:
+    """Builds a season table shaped like the concatenated FanGraphs pulls, without any network access
+
+    Players are generated with careers of consecutive seasons until `n_rows` player-seasons
+    exist. Each player has a unique IDfg, but a share of players reuse another player's name,
+    as happens in the real data (and which the pipeline, keyed on names, merges into one career).
+
+    Args:
+        n_rows: number of player-season rows
+        category: batters or pitchers, selecting the stat columns. Defaults to batters.
+        mean_seasons: average career length. Defaults to 8.
+        career_distribution: distribution of career lengths, see career_lengths. Defaults to "geometric".
+        name_collision_rate: share of players named after another player. Defaults to 0.
+        start_year: first season. Defaults to 1900.
+        end_year: last season. Defaults to 2020.
+        seed: random seed. Defaults to 0.
+        shuffle: shuffle the rows, as the pulls are not ordered by player. Defaults to True.
+
+    Returns:
+        Dataframe with a row per player-year
+    """
+
+    assert category in {"batters", "pitchers"}, \
+        f"category must be one of 'batters' or 'pitchers', received {category}"
+
+    rng = np.random.default_rng(seed)
+    n_years = end_year - start_year + 1
+
+    # enough careers to cover n_rows, with the last one cut short to land on it exactly
+    lengths = career_lengths(max(n_rows, 1), mean_seasons, career_distribution, min(25, n_years), rng)
+    n_players = int(np.searchsorted(np.cumsum(lengths), n_rows)) + 1
+    lengths = lengths[:n_players]
+    lengths[-1] -= lengths.sum() - n_rows
+
+    names = np.char.add("Player ", np.arange(n_players).astype(str))
+    collides = rng.random(n_players) < name_collision_rate
+    names[collides] = names[rng.integers(0, n_players, size=int(collides.sum()))]
+
+    # seasons run consecutively from a random debut year, at ages starting between 20 and 26
+    player = np.repeat(np.arange(n_players), lengths)
+    career_year = np.arange(n_rows) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    debuts = start_year + (rng.random(n_players) * (n_years - lengths + 1)).astype(int)
+    debut_ages = rng.integers(20, 27, size=n_players)
+
+    stats = pd.DataFrame({
+        "IDfg": player + 1,
+        "Season": debuts[player] + career_year,
+        "Name": names[player],
+        "Team": np.array(TEAMS)[rng.integers(0, len(TEAMS), size=n_rows)],
+        "Age": debut_ages[player] + career_year,
+    })
+    columns = _batting_columns(n_rows, rng) if category == "batters" else _pitching_columns(n_rows, rng)
+    for col, values in columns.items():
+        stats[col] = values
+    stats["WAR"] = np.round(rng.normal(1.5, 2.0, size=n_rows), 1)
+
+    if shuffle:
+        stats = stats.sample(frac=1.0, random_state=seed).reset_index(drop=True)
+
+    return stats
+
+
+def synthetic_fetcher(stats: PandasDataFrame, latency: float = 0.0) -> Callable[[int], PandasDataFrame]:
+    """Serves a synthetic season table one season at a time, like a pybaseball season fetch
+
+    Args:
+        stats: row per player-season, e.g. from synthetic_stats
+        latency: seconds to wait per season, simulating the network round-trip. Defaults to 0.
+
+    Returns:
+        Season fetcher usable by _load_batting_stats / _load_pitching_stats
+    """
+
+    seasons = {year: season.reset_index(drop=True) for year, season in stats.groupby("Season")}
+    empty = stats.iloc[:0]
+
+    def fetch(year: int) -> PandasDataFrame:
+        if latency:
+            time.sleep(latency)
+        return seasons.get(year, empty).copy()
+
+    return fetch